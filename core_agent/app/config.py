@@ -15,14 +15,32 @@ PERSONALITY_PATH = RESOURCES_DIR / "prompts" /"personality.md"
 REFLECTION_PROMPT_PATH = RESOURCES_DIR / "prompts" / "reflection_prompt.txt"
 PROMPT_MESSAGE_LIMIT = int(os.getenv("PROMPT_MESSAGE_LIMIT", "15"))
 REFLECTION_MESSAGE_LIMIT = int(os.getenv("REFLECTION_MESSAGE_LIMIT", "10"))
+# Turns shorter than this (user input + reply) with no fact-like phrasing skip reflection
+REFLECTION_MIN_CHARS = int(os.getenv("REFLECTION_MIN_CHARS", "200"))
+# Messages older than the prompt window are folded into a rolling summary this
+# many at a time (0 disables summarization)
+SUMMARY_CHUNK_MESSAGES = int(os.getenv("SUMMARY_CHUNK_MESSAGES", "8"))
 
 MAX_SCREEN_CONTEXTS = int(os.getenv("MAX_SCREEN_CONTEXTS", "5"))
 
+# Batching window (seconds) for session writes: everything submitted within it
+# is written together, one append + fdatasync per file.
+SESSION_FLUSH_DELAY = float(os.getenv("SESSION_FLUSH_DELAY", "0.02"))
+# Worker threads in the shared background I/O pool
+IO_WORKERS = int(os.getenv("IO_WORKERS", str(min(8, (os.cpu_count() or 1) + 4))))
+
 # Debugging / audit
 REVISION_LOG_PATH = SESSIONS_DIR / "revision_log.jsonl"
 
 # Memory gating
 MIN_MEMORY_CONFIDENCE = float(os.getenv("MIN_MEMORY_CONFIDENCE", "0.4"))
+# Ask for the reply and the memory updates in one LLM call instead of two
+COMBINED_REFLECTION = os.getenv("COMBINED_REFLECTION", "false").strip().lower() in ("1", "true", "yes")
+# Memories injected into the main prompt per turn (most relevant first)
+MEMORY_BLOCK_TOP_K = int(os.getenv("MEMORY_BLOCK_TOP_K", "32"))
+
+# Identical LLM requests served from memory (0 disables)
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "512"))
 
 # OpenRouter configuration
 OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY", "")
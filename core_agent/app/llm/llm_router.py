@@ -1,11 +1,18 @@
 from __future__ import annotations
 
+import atexit
+import functools
 import json
+import logging
+import os
+import re
+import threading
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, Iterator, List, Optional
 from ..core.contracts import InitialResponseJson, PuppetDirective
 
 import requests
+from requests.adapters import HTTPAdapter
 
 from ..config import (
 	RESOURCES_DIR
@@ -17,20 +24,63 @@ from ..config import (
 	OPENROUTER_REQUEST_TIMEOUT,
 	OPENROUTER_SITE_URL,
 )
+from ..utils import fast_json
 from ..utils.logger import get_logger
+from .response_cache import get_response_cache, make_key
 
 logger = get_logger(__name__)
 
 
+# Keep-alive sessions for OpenRouter calls, so calls after the first skip the
+# TCP and TLS handshakes. requests.Session is not guaranteed thread-safe and
+# calls come from the request thread and IO_POOL workers, so each thread gets
+# its own.
+_HTTP_LOCAL = threading.local()
+_HTTP_SESSIONS: List[requests.Session] = []
+_HTTP_SESSIONS_LOCK = threading.Lock()
+
+
+def _http() -> requests.Session:
+	session = getattr(_HTTP_LOCAL, "session", None)
+	if session is None:
+		session = requests.Session()
+		session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=1))
+		_HTTP_LOCAL.session = session
+		with _HTTP_SESSIONS_LOCK:
+			_HTTP_SESSIONS.append(session)
+	return session
+
+
+@atexit.register
+def _close_http_sessions() -> None:
+	with _HTTP_SESSIONS_LOCK:
+		for session in _HTTP_SESSIONS:
+			session.close()
+		_HTTP_SESSIONS.clear()
+
+
 class OpenRouterError(RuntimeError):
 	"""Raised when an OpenRouter request or response fails."""
 
+
+class OpenRouterTransportError(OpenRouterError):
+	"""The request never got a usable answer: a connection error or a timeout."""
+
+
+def _request_error(exc: requests.RequestException, message: str) -> OpenRouterError:
+	if isinstance(exc, (requests.ConnectionError, requests.Timeout)):
+		return OpenRouterTransportError(message)
+	return OpenRouterError(message)
+
 def _parse_initial_response(text: str) -> InitialResponseJson:
 	try:
-		data = json.loads(text)
+		data = fast_json.loads(text)
 	except json.JSONDecodeError as exc:
 		raise OpenRouterError("Initial response was not valid JSON") from exc
+	return _initial_response_from_data(data)
 
+
+def _initial_response_from_data(data: Any) -> InitialResponseJson:
 	if not isinstance(data, dict):
 		raise OpenRouterError("Initial response JSON was not an object")
 
@@ -85,25 +135,73 @@ def _build_headers() -> Dict[str, str]:
 	return headers
 
 
+# OpenRouter providers that take explicit `cache_control` breakpoints on
+# content parts. Others (e.g. OpenAI) cache prefixes automatically.
+_CACHE_CONTROL_MODEL_PREFIXES = ("anthropic/", "google/")
+CACHE_CONTROL_EPHEMERAL = {"type": "ephemeral"}
+
+
+def _apply_cache_breakpoints(
+	messages: List[Dict[str, Any]],
+	model: str,
+	breakpoints: Optional[List[int]],
+) -> List[Dict[str, Any]]:
+	"""Mark `messages[i]` for each breakpoint as the end of a cacheable prefix.
+
+	Only models that need explicit markers get them. Marked messages are
+	copied; the caller's list and dicts are never mutated.
+	"""
+	if not breakpoints or not model.startswith(_CACHE_CONTROL_MODEL_PREFIXES):
+		return messages
+	prepared = list(messages)
+	for i in set(breakpoints):
+		if not 0 <= i < len(prepared):
+			continue
+		msg = prepared[i]
+		prepared[i] = {
+			**msg,
+			"content": [{"type": "text", "text": msg.get("content", ""), "cache_control": CACHE_CONTROL_EPHEMERAL}],
+		}
+	return prepared
+
+
 def _build_payload(
-	messages: List[Dict[str, str]],
+	messages: List[Dict[str, Any]],
 	model: Optional[str],
 	*,
 	response_format: Optional[Dict[str, Any]] = None,
+	cache_breakpoints: Optional[List[int]] = None,
 ) -> Dict[str, object]:
+	model_name = model or OPENROUTER_DEFAULT_MODEL
 	payload: Dict[str, object] = {
-		"model": model or OPENROUTER_DEFAULT_MODEL,
-		"messages": messages,
+		"model": model_name,
+		"messages": _apply_cache_breakpoints(messages, model_name, cache_breakpoints),
 	}
 	if response_format is not None:
 		payload["response_format"] = response_format
 	return payload
 
 
+def _log_usage(data: Dict[str, Any]) -> None:
+	usage = data.get("usage") if isinstance(data, dict) else None
+	if not isinstance(usage, dict):
+		return
+	details = usage.get("prompt_tokens_details") or {}
+	cached = details.get("cached_tokens", usage.get("cache_read_input_tokens", 0))
+	logger.info(
+		"OpenRouter usage: prompt=%s cached=%s cache_write=%s completion=%s",
+		usage.get("prompt_tokens"),
+		cached,
+		usage.get("cache_creation_input_tokens", 0),
+		usage.get("completion_tokens"),
+	)
+
+
 def _post_chat_completion(payload: Dict[str, object]) -> str:
-	logger.debug("Sending payload to OpenRouter: %s", payload)
+	if logger.isEnabledFor(logging.DEBUG):
+		logger.debug("Sending payload to OpenRouter: %s", payload)
 	try:
-		response = requests.post(
+		response = _http().post(
 			OPENROUTER_BASE_URL,
 			headers=_build_headers(),
 			json=payload,
@@ -112,9 +210,16 @@ def _post_chat_completion(payload: Dict[str, object]) -> str:
 		response.raise_for_status()
 	except requests.RequestException as exc:
 		logger.error("OpenRouter request failed: %s", exc)
-		raise OpenRouterError("OpenRouter request failed") from exc
+		raise _request_error(exc, "OpenRouter request failed") from exc
 
-	data = response.json()
+	# Parse the raw body bytes directly; response.json() would first decode
+	# them to str and then hand that to the stdlib parser.
+	try:
+		data = fast_json.loads(response.content)
+	except json.JSONDecodeError as exc:
+		logger.error("OpenRouter response was not valid JSON")
+		raise OpenRouterError("OpenRouter response was not valid JSON") from exc
+	_log_usage(data)
 	try:
 		return data["choices"][0]["message"]["content"].strip()
 	except (KeyError, IndexError, TypeError) as exc:
@@ -122,29 +227,191 @@ def _post_chat_completion(payload: Dict[str, object]) -> str:
 		raise OpenRouterError("OpenRouter response missing message content") from exc
 
 
+def _stream_chat_completion(payload: Dict[str, object]) -> Iterator[str]:
+	"""POST with `stream: true` and yield content deltas from the SSE stream."""
+	if logger.isEnabledFor(logging.DEBUG):
+		logger.debug("Sending streaming payload to OpenRouter: %s", payload)
+	try:
+		response = _http().post(
+			OPENROUTER_BASE_URL,
+			headers=_build_headers(),
+			json={**payload, "stream": True},
+			timeout=OPENROUTER_REQUEST_TIMEOUT,
+			stream=True,
+		)
+		response.raise_for_status()
+	except requests.RequestException as exc:
+		logger.error("OpenRouter request failed: %s", exc)
+		raise _request_error(exc, "OpenRouter request failed") from exc
+
+	with response:
+		try:
+			for line in response.iter_lines():
+				# Blank lines separate events; ":" lines are keep-alive comments.
+				if not line.startswith(b"data:"):
+					continue
+				data = line[5:].strip()
+				if data == b"[DONE]":
+					return
+				chunk = fast_json.loads(data)
+				if "error" in chunk:
+					logger.error("OpenRouter stream error: %s", chunk["error"])
+					raise OpenRouterError("OpenRouter stream returned an error")
+				_log_usage(chunk)
+				try:
+					delta = chunk["choices"][0]["delta"].get("content")
+				except (KeyError, IndexError, TypeError, AttributeError):
+					continue
+				if delta:
+					yield delta
+		except requests.RequestException as exc:
+			logger.error("OpenRouter stream failed: %s", exc)
+			raise _request_error(exc, "OpenRouter stream failed") from exc
+		except json.JSONDecodeError as exc:
+			raise OpenRouterError("OpenRouter stream sent invalid JSON") from exc
+
+
+class _DisplayTextStream:
+	"""Pull the `display_text` value out of a streamed JSON reply as it arrives.
+
+	`feed` takes raw content deltas and returns the newly decoded part of
+	display_text ("" when there is none yet); the rest of the JSON is skipped.
+	"""
+
+	_KEY_RE = re.compile(r'(?<!\\)"display_text"\s*:\s*"')
+
+	def __init__(self) -> None:
+		self._buf = ""
+		self._in_value = False
+		self._done = False
+
+	def feed(self, delta: str) -> str:
+		if self._done:
+			return ""
+		self._buf += delta
+		if not self._in_value:
+			match = self._KEY_RE.search(self._buf)
+			if match is None:
+				return ""
+			self._buf = self._buf[match.end():]
+			self._in_value = True
+		return self._take_value()
+
+	def _take_value(self) -> str:
+		buf = self._buf
+		i, n = 0, len(buf)
+		# End of the longest prefix that decodes on its own (no split escapes).
+		safe = 0
+		while i < n:
+			ch = buf[i]
+			if ch == '"':
+				self._done = True
+				self._buf = ""
+				return _decode_json_string(buf[:i])
+			if ch != "\\":
+				i += 1
+			elif i + 1 >= n:
+				break
+			elif buf[i + 1] != "u":
+				i += 2
+			elif i + 6 > n:
+				break
+			elif buf[i + 2 : i + 4].lower() in ("d8", "d9", "da", "db"):
+				# High surrogate: wait for the low half so the pair decodes together.
+				if i + 12 > n:
+					break
+				i += 12
+			else:
+				i += 6
+			safe = i
+		self._buf = buf[safe:]
+		return _decode_json_string(buf[:safe])
+
+
+def _decode_json_string(body: str) -> str:
+	if not body:
+		return ""
+	try:
+		return fast_json.loads(f'"{body}"')
+	except json.JSONDecodeError:
+		# Only the streamed preview is affected; the full reply is parsed later.
+		return ""
+
+
 def _load_json_file(path: Path) -> Dict[str, Any]:
+	"""Load a response-format file, re-reading it only after it changes.
+
+	The returned dict is shared between calls and must not be mutated.
+	"""
 	try:
-		return json.loads(path.read_text(encoding="utf-8"))
+		st = os.stat(path)
+		return _load_json_cached(path, st.st_mtime_ns, st.st_size)
 	except FileNotFoundError as exc:
 		raise OpenRouterError(f"Required JSON file not found: {path}") from exc
 	except json.JSONDecodeError as exc:
 		raise OpenRouterError(f"Invalid JSON in file: {path}") from exc
 
 
-def generate_response(messages: List[Dict[str, str]], *, model: Optional[str] = None, path: Optional[Path] = None) -> InitialResponseJson:
-	"""Send the chat history to OpenRouter and return the assistant reply."""
+@functools.lru_cache(maxsize=8)
+def _load_json_cached(path: Path, mtime_ns: int, size: int) -> Dict[str, Any]:
+	return fast_json.loads(path.read_bytes())
+
+
+def generate_response(
+	messages: List[Dict[str, str]],
+	*,
+	model: Optional[str] = None,
+	path: Optional[Path] = None,
+	cache_breakpoints: Optional[List[int]] = None,
+	on_token: Optional[Callable[[str], None]] = None,
+) -> InitialResponseJson:
+	"""Send the chat history to OpenRouter and return the assistant reply.
+
+	`cache_breakpoints` are message indices that end a stable prompt prefix;
+	providers that need explicit markers get them there. With `on_token` the
+	reply is streamed and the display_text is passed to it piece by piece as
+	it arrives (the surrounding JSON is never passed on).
+	"""
+	if on_token is not None:
+		chunks: List[str] = []
+		display = _DisplayTextStream()
+		for token in generate_response_stream(messages, model=model, path=path, cache_breakpoints=cache_breakpoints):
+			chunks.append(token)
+			text = display.feed(token)
+			if text:
+				on_token(text)
+		return _parse_initial_response("".join(chunks).strip())
+
 	path = path or (RESOURCES_DIR / "prompts" / "initial_response_format.json") #TODO extract to constant
 	response_format = _load_json_file(path)
-	payload = _build_payload(messages, model, response_format=response_format)
+	payload = _build_payload(messages, model, response_format=response_format, cache_breakpoints=cache_breakpoints)
 	raw_response = _post_chat_completion(payload)
 	return _parse_initial_response(raw_response)
 
 
+def generate_response_stream(
+	messages: List[Dict[str, str]],
+	*,
+	model: Optional[str] = None,
+	path: Optional[Path] = None,
+	cache_breakpoints: Optional[List[int]] = None,
+) -> Iterator[str]:
+	"""Stream the assistant reply, yielding raw text deltas as they arrive.
+
+	The joined deltas are the same JSON document `generate_response` parses.
+	"""
+	path = path or (RESOURCES_DIR / "prompts" / "initial_response_format.json")
+	response_format = _load_json_file(path)
+	payload = _build_payload(messages, model, response_format=response_format, cache_breakpoints=cache_breakpoints)
+	return _stream_chat_completion(payload)
+
+
 def generate_reflection_response(
 	messages: List[Dict[str, str]],
 	*,
 	model: Optional[str] = None,
 	response_format_path: Optional[Path] = None,
+	cache_breakpoints: Optional[List[int]] = None,
 ) -> str:
 	"""Run the reflection query with a strict JSON schema response format.
 
@@ -153,5 +420,115 @@ def generate_reflection_response(
 	"""
 	path = response_format_path or (RESOURCES_DIR / "prompts" / "reflection_response_format.json")
 	response_format = _load_json_file(path)
-	payload = _build_payload(messages, model, response_format=response_format)
+	payload = _build_payload(messages, model, response_format=response_format, cache_breakpoints=cache_breakpoints)
 	return _post_chat_completion(payload)
+
+
+def generate_text(messages: List[Dict[str, str]], *, model: Optional[str] = None) -> str:
+	"""Plain-text completion, for internal jobs like conversation summaries."""
+	payload = _build_payload(messages, model)
+	return _post_chat_completion(payload)
+
+
+def _combined_response_format() -> Dict[str, Any]:
+	"""Response format for the combined call, assembled from the reply and
+	reflection formats so it always matches them."""
+	reply = _load_json_file(RESOURCES_DIR / "prompts" / "initial_response_format.json")
+	reflection = _load_json_file(RESOURCES_DIR / "prompts" / "reflection_response_format.json")
+	return {
+		"type": "json_schema",
+		"json_schema": {
+			"name": "agent_response_with_memory",
+			"strict": True,
+			"schema": {
+				"type": "object",
+				"additionalProperties": False,
+				"required": ["response", "memory_updates"],
+				"properties": {
+					"response": reply["json_schema"]["schema"],
+					"memory_updates": reflection["json_schema"]["schema"],
+				},
+			},
+		},
+	}
+
+
+def generate_combined_response(
+	messages: List[Dict[str, str]],
+	*,
+	model: Optional[str] = None,
+	cache_breakpoints: Optional[List[int]] = None,
+) -> tuple[InitialResponseJson, Dict[str, Any]]:
+	"""Get the assistant reply and the reflection memory updates in one call.
+
+	Returns (reply, memory_updates). Raises OpenRouterError when the output
+	does not match the combined schema, so callers can fall back to two calls,
+	and OpenRouterTransportError when the request itself did not get through.
+	"""
+	response_format = _combined_response_format()
+	payload = _build_payload(messages, model, response_format=response_format, cache_breakpoints=cache_breakpoints)
+	raw_response = _post_chat_completion(payload)
+	try:
+		data = fast_json.loads(raw_response)
+	except json.JSONDecodeError as exc:
+		raise OpenRouterError("Combined response was not valid JSON") from exc
+	if not isinstance(data, dict):
+		raise OpenRouterError("Combined response JSON was not an object")
+
+	memory_updates = data.get("memory_updates")
+	if not isinstance(memory_updates, dict):
+		raise OpenRouterError('Combined response JSON field "memory_updates" must be an object')
+	return _initial_response_from_data(data.get("response")), memory_updates
+
+
+def generate_response_cached(
+	messages: List[Dict[str, str]],
+	*,
+	model: Optional[str] = None,
+	path: Optional[Path] = None,
+	cache_breakpoints: Optional[List[int]] = None,
+	bypass_cache: bool = False,
+) -> InitialResponseJson:
+	"""`generate_response`, but an identical earlier request is answered from
+	memory. Pass `bypass_cache=True` when a fresh sample is required."""
+	if bypass_cache:
+		return generate_response(messages, model=model, path=path, cache_breakpoints=cache_breakpoints)
+
+	cache = get_response_cache()
+	key = make_key("response", model or OPENROUTER_DEFAULT_MODEL, str(path or ""), messages)
+	cached = cache.get(key)
+	if cached is not None:
+		logger.info("Response cache hit")
+		return cached
+
+	result = generate_response(messages, model=model, path=path, cache_breakpoints=cache_breakpoints)
+	cache.put(key, result)
+	return result
+
+
+def generate_reflection_response_cached(
+	messages: List[Dict[str, str]],
+	*,
+	model: Optional[str] = None,
+	response_format_path: Optional[Path] = None,
+	cache_breakpoints: Optional[List[int]] = None,
+	bypass_cache: bool = False,
+) -> str:
+	"""`generate_reflection_response` with the same exact-match cache."""
+	if bypass_cache:
+		return generate_reflection_response(
+			messages, model=model, response_format_path=response_format_path, cache_breakpoints=cache_breakpoints
+		)
+
+	cache = get_response_cache()
+	key = make_key("reflection", model or OPENROUTER_DEFAULT_MODEL, str(response_format_path or ""), messages)
+	cached = cache.get(key)
+	if cached is not None:
+		logger.info("Reflection cache hit")
+		return cached
+
+	result = generate_reflection_response(
+		messages, model=model, response_format_path=response_format_path, cache_breakpoints=cache_breakpoints
+	)
+	cache.put(key, result)
+	return result
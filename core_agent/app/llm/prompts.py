@@ -6,62 +6,78 @@ session orchestration.
 
 from __future__ import annotations
 
+import functools
+import logging
+import os
+from pathlib import Path
 from typing import Optional
 
 from ..config import (
+	MEMORY_BLOCK_TOP_K,
 	MIN_MEMORY_CONFIDENCE,
 	PERSONALITY_PATH,
 	PROMPT_MESSAGE_LIMIT,
-	REFLECTION_MESSAGE_LIMIT,
 	REFLECTION_PROMPT_PATH,
+	SUMMARY_CHUNK_MESSAGES,
 )
 
 from ..memory import memory_system
 from ..memory import session as session_module
+from ..utils.hashing import digest
+from ..utils.logger import get_logger
 
+logger = get_logger(__name__)
 
-def get_personality() -> str:
-	if PERSONALITY_PATH.exists():
-		return PERSONALITY_PATH.read_text(encoding="utf-8")
-	return ""
 
+def _stat_stamp(path: Path) -> Optional[tuple[int, int]]:
+	try:
+		st = os.stat(path)
+	except FileNotFoundError:
+		return None
+	return (st.st_mtime_ns, st.st_size)
 
-def get_memory_block() -> str:
-	items = memory_system.load_ltm()
-	if not items:
-		return "MEMORY: none."
 
-	def sort_key(item: dict) -> tuple:
-		# Prefer recently updated memories first.
-		return (str(item.get("last_updated", "")), str(item.get("created_at", "")))
+@functools.lru_cache(maxsize=8)
+def _load_template(path: Path, stamp: tuple[int, int]) -> str:
+	"""Read a prompt file; `stamp` only keys the cache so edits are picked up."""
+	return path.read_text(encoding="utf-8")
 
-	sorted_items = sorted(
-		[item for item in items if isinstance(item, dict)],
-		key=sort_key,
-		reverse=True,
-	)
 
-	lines: list[str] = ["MEMORY:"]
-	for item in sorted_items:
-		try:
-			confidence = float(item.get("confidence", 0.0))
-		except (TypeError, ValueError):
-			confidence = 0.0
-		if confidence < MIN_MEMORY_CONFIDENCE:
-			continue
+def _read_template(path: Path, label: str) -> str:
+	stamp = _stat_stamp(path)
+	if stamp is None:
+		raise FileNotFoundError(f"{label} file not found: {path}")
+	return _load_template(path, stamp)
 
+
+def get_personality() -> str:
+	stamp = _stat_stamp(PERSONALITY_PATH)
+	if stamp is None:
+		return ""
+	return _load_template(PERSONALITY_PATH, stamp)
+
+
+def get_memory_block(context: str = "", k: int = MEMORY_BLOCK_TOP_K) -> str:
+	"""Render the top-`k` memories for `context` as the prompt memory block."""
+	items = memory_system.search_ltm(context, k=k, min_confidence=MIN_MEMORY_CONFIDENCE)
+
+	lines: list[str] = ["MEMORY:"]
+	# Sorted by id so the same selection always renders identically.
+	for item in sorted(items, key=lambda item: str(item.get("id", ""))):
 		subject = str(item.get("subject", "")).strip() or "unknown"
 		mem_type = str(item.get("type", "")).strip() or "unknown"
 		content = str(item.get("content", "")).strip()
-		if not content:
-			continue
-
 		subject_label = "User" if subject.lower() == "user" else subject.capitalize()
 		lines.append(f"- {subject_label} {mem_type}: {content}")
 
 	# If everything was empty/invalid, fall back.
 	return "\n".join(lines) if len(lines) > 1 else "MEMORY: none."
 
+
+def memory_block_version(text: str) -> str:
+	"""Short digest of a memory block, to tell whether it changed between turns."""
+	return digest(text.encode("utf-8"), 8).hex()
+
 def get_reflection_memory_block() -> str:
 	items = memory_system.load_sanitized_ltm()
 	if not items:
@@ -93,10 +109,24 @@ def get_reflection_memory_block() -> str:
 
 	return "\n".join(lines) if len(lines) > 1 else "MEMORY: none."
 
-def _construct_system_message_content() -> str:
-	personality = get_personality()
-	memory_block = get_memory_block()
-	return personality + "\n\n" + memory_block
+@functools.lru_cache(maxsize=1)
+def _static_system_messages(personality_stamp: Optional[tuple[int, int]]) -> tuple[dict, dict]:
+	"""Personality + response-format rules: the part of the prompt that never
+	changes between turns, built once per personality file version.
+
+	The stamp is only a cache key. The returned dicts are shared between turns
+	and must not be mutated.
+	"""
+	personality = {"role": "system", "content": get_personality()}
+	return personality, _construct_response_format_system_message()
+
+
+def _memory_system_message(user_input: str) -> dict[str, str]:
+	"""Memory block message: the memories most relevant to this turn."""
+	text = get_memory_block(user_input)
+	if logger.isEnabledFor(logging.DEBUG):
+		logger.debug("Memory block version %s", memory_block_version(text))
+	return {"role": "system", "content": text}
 
 def _construct_response_format_system_message() -> dict[str, str]:
 	return {
@@ -148,29 +178,126 @@ def _strip_message_for_llm(msg: dict) -> dict[str, str]:
 	return {"role": role, "content": content}
 
 
-def construct_prompt(session, user_input: str) -> list:
-	"""Build the main chat prompt for the assistant."""
-	system_message = {"role": "system", "content": _construct_system_message_content()}
+def _construct_summary_system_message(summary: str) -> dict[str, str]:
+	return {
+		"role": "system",
+		"content": f"CONVERSATION SUMMARY (earlier messages no longer shown):\n{summary}",
+	}
+
+
+def history_start(message_count: int) -> int:
+	"""Index of the first message the main prompt shows verbatim.
+
+	At most PROMPT_MESSAGE_LIMIT messages are shown. The start is rounded up to
+	a SUMMARY_CHUNK_MESSAGES boundary, so old messages leave the prompt a whole
+	summary chunk at a time instead of one per turn; just after a step the
+	window holds up to a chunk fewer than the limit.
+	"""
+	start = max(message_count - max(PROMPT_MESSAGE_LIMIT, 0), 0)
+	block = SUMMARY_CHUNK_MESSAGES
+	if block > 0 and start % block:
+		start += block - start % block
+	return min(start, message_count)
+
+
+def _prompt_parts(session, user_input: str, system_messages: list, memory_message: dict) -> tuple[list, list]:
+	# Fill one preallocated list instead of slicing history and concatenating.
+	messages = session.messages
+	start = history_start(len(messages))
+	n = len(messages) - start  # never more than PROMPT_MESSAGE_LIMIT
+	if session.summary:
+		# Changes only when older messages are folded in, so it stays cacheable.
+		system_messages = [*system_messages, _construct_summary_system_message(session.summary)]
+	head = len(system_messages)
+	static: list = [None] * (head + n)
+	static[:head] = system_messages
+	pos = head
+	for i in range(len(messages) - n, len(messages)):
+		static[pos] = _strip_message_for_llm(messages[i])
+		pos += 1
+
+	dynamic: list = [memory_message]
 	screen_context_message = _construct_screen_context_system_message(session)
-	limit = max(PROMPT_MESSAGE_LIMIT, 0)
-	recent_messages_raw = session.messages[-limit:] if limit > 0 else []
-	recent_messages = [_strip_message_for_llm(msg) for msg in recent_messages_raw]
-	base = [system_message]
 	if screen_context_message:
-		base.append(screen_context_message)
-	
-	base.append(_construct_response_format_system_message())
-	return base + recent_messages + [{"role": "user", "content": user_input}]
+		dynamic.append(screen_context_message)
+	dynamic.append({"role": "user", "content": user_input})
+	return static, dynamic
+
+
+def construct_prompt_parts(session, user_input: str) -> tuple[list, list]:
+	"""Build the main chat prompt as (static_prefix, dynamic_suffix).
+
+	The prefix is the system rules, the conversation summary, then prior turns.
+	Once history passes PROMPT_MESSAGE_LIMIT, old messages leave it a summary
+	chunk at a time (see `history_start`) and are folded into the summary. So
+	the prefix only grows between those steps and a provider can reuse its
+	cached prefill; with summarization disabled the window slides every turn
+	and only the system rules stay cacheable. Everything that changes per turn (memory
+	selection, screen context, the new input) goes in the suffix.
+	"""
+	system_messages = list(_static_system_messages(_stat_stamp(PERSONALITY_PATH)))
+	return _prompt_parts(session, user_input, system_messages, _memory_system_message(user_input))
+
 
+def prompt_cache_breakpoints(static: list) -> list[int]:
+	"""Indices worth marking as provider cache breakpoints: the end of the
+	leading system rules and the end of the static prefix."""
+	system_end = 0
+	while system_end < len(static) and static[system_end].get("role") == "system":
+		system_end += 1
+	return sorted({max(system_end - 1, 0), len(static) - 1})
 
-def construct_reflection_prompt(session) -> list:
-	"""Build the reflection prompt used to propose long-term memory updates."""
-	recent_messages = (
-		session.messages[-REFLECTION_MESSAGE_LIMIT:]
-		if len(session.messages) >= REFLECTION_MESSAGE_LIMIT
-		else session.messages
+
+def _construct_combined_instructions_message(reflection_instructions: str) -> dict[str, str]:
+	return {
+		"role": "system",
+		"content": (
+			"Answer with ONE JSON object that has two fields:\n"
+			'- "response": your reply to the user, following the response schema and rules above.\n'
+			'- "memory_updates": long-term memory updates for the conversation so far '
+			"including the latest user message, following these instructions:\n\n"
+			f"{reflection_instructions}"
+		),
+	}
+
+
+def construct_combined_prompt(session, user_input: str) -> tuple[list, list]:
+	"""Build a single prompt asking for the reply and the reflection together.
+
+	Same (static_prefix, dynamic_suffix) layout as `construct_prompt_parts`;
+	the memory block carries ids so the model can target revisions.
+	"""
+	instructions = _construct_combined_instructions_message(
+		_read_template(REFLECTION_PROMPT_PATH, "Reflection prompt")
 	)
+	system_messages = [*_static_system_messages(_stat_stamp(PERSONALITY_PATH)), instructions]
+	memory_message = {"role": "system", "content": get_reflection_memory_block()}
+	return _prompt_parts(session, user_input, system_messages, memory_message)
 
+
+def construct_summary_prompt(previous_summary: str, messages: list) -> list:
+	"""Build the prompt that folds `messages` into the rolling summary."""
+	messages_text = "\n".join(f"{msg['role'].upper()}: {msg['content']}" for msg in messages)
+	return [
+		{
+			"role": "system",
+			"content": (
+				"You maintain a running summary of a conversation between a user and an assistant.\n"
+				"Update the summary with the new messages. Keep facts, decisions, open questions and "
+				"the user's stated preferences; drop small talk. Reply with the updated summary only, "
+				"as plain text in at most a few short paragraphs."
+			),
+		},
+		{
+			"role": "user",
+			"content": f"CURRENT SUMMARY:\n{previous_summary or '(none)'}\n\nNEW MESSAGES:\n{messages_text}",
+		},
+	]
+
+
+def construct_reflection_prompt_from_messages(recent_messages: list) -> list:
+	"""Build the reflection prompt used to propose long-term memory updates,
+	from a window of recent messages taken by the caller."""
 	messages_text = "\n".join(
 		[f"{msg['role'].upper()}: {msg['content']}" for msg in recent_messages]
 	)
@@ -178,10 +305,7 @@ def construct_reflection_prompt(session) -> list:
 		get_reflection_memory_block() + "\n\n" + "RECENT MESSAGES:\n\n" + messages_text
 	)
 
-	if not REFLECTION_PROMPT_PATH.exists():
-		raise FileNotFoundError(f"Reflection prompt file not found: {REFLECTION_PROMPT_PATH}")
-
-	reflection_prompt_text = REFLECTION_PROMPT_PATH.read_text(encoding="utf-8")
+	reflection_prompt_text = _read_template(REFLECTION_PROMPT_PATH, "Reflection prompt")
 	return [
 		{"role": "system", "content": reflection_prompt_text},
 		{"role": "user", "content": context_blob},
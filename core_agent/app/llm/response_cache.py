@@ -0,0 +1,62 @@
+"""Exact-match cache for LLM responses.
+
+Identical requests (same messages, model and response format) come back from
+memory instead of making another OpenRouter round trip. This mostly pays off
+in dev loops and reruns, where the same prompt is sent again verbatim.
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Generic, Hashable, Optional, TypeVar
+
+from ..config import RESPONSE_CACHE_SIZE
+from ..utils.hashing import digest
+
+V = TypeVar("V")
+
+
+def make_key(*parts: Any) -> bytes:
+	"""Digest of the canonical JSON form of `parts` (dict key order ignored)."""
+	# Stdlib json on purpose: keys must stay stable across runs with and
+	# without orjson, and default=str covers any non-JSON part.
+	blob = json.dumps(parts, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+	return digest(blob.encode("utf-8"))
+
+
+class ResponseCache(Generic[V]):
+	"""Thread-safe bounded LRU. A `maxsize` of 0 disables caching."""
+
+	def __init__(self, maxsize: int) -> None:
+		self.maxsize = max(maxsize, 0)
+		self._items: OrderedDict[Hashable, V] = OrderedDict()
+		self._lock = threading.Lock()
+
+	def get(self, key: Hashable) -> Optional[V]:
+		with self._lock:
+			value = self._items.get(key)
+			if value is not None:
+				self._items.move_to_end(key)
+			return value
+
+	def put(self, key: Hashable, value: V) -> None:
+		if not self.maxsize:
+			return
+		with self._lock:
+			self._items[key] = value
+			self._items.move_to_end(key)
+			while len(self._items) > self.maxsize:
+				self._items.popitem(last=False)
+
+	def clear(self) -> None:
+		with self._lock:
+			self._items.clear()
+
+
+_RESPONSE_CACHE: ResponseCache[Any] = ResponseCache(RESPONSE_CACHE_SIZE)
+
+
+def get_response_cache() -> ResponseCache[Any]:
+	return _RESPONSE_CACHE
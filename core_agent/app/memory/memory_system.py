@@ -1,15 +1,42 @@
 from __future__ import annotations
 
+import heapq
+import itertools
 import json
+import re
+import threading
+import time
+from collections import OrderedDict
 from dataclasses import dataclass
-from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
 
-from ..config import REVISION_LOG_PATH, SESSIONS_DIR
+from ..config import REFLECTION_MIN_CHARS, REVISION_LOG_PATH, SESSIONS_DIR
+from ..utils import fast_json
+from .schemas import CANDIDATE_TYPES, REVISION_TYPES
+from ..utils.atomic_write import atomic_write_bytes
+
+try:
+	import ijson
+	IJSON_AVAILABLE = True
+except ImportError:
+	IJSON_AVAILABLE = False
 
 
 LTM_PATH = SESSIONS_DIR / "ltm.json"
+# Above this size the store is parsed incrementally (when ijson is installed)
+# instead of holding the raw text and the object graph in memory together.
+LTM_STREAM_THRESHOLD_BYTES = 1_000_000
+
+# Parsed LTM stores keyed by path. Each entry holds the file stamp it was read
+# at, the item list and its id index, so repeated loads within one process only
+# re-parse the file when it changed on disk.
+_LTM_CACHE: Dict[Path, Tuple[Tuple[int, int], List[Dict[str, Any]], Dict[str, int]]] = {}
+# Serializes read-modify-write cycles on the store; reflections can run
+# concurrently on background threads.
+_LTM_LOCK = threading.RLock()
+
+_TOKEN_RE = re.compile(r"[a-z0-9]{3,}")
 
 @dataclass
 class MemoryItem:
@@ -37,88 +64,141 @@ class MemoryItem:
 		}
 
 
-def gate_memory_updates(
-	payload: Dict[str, Any],
-	*,
-	min_confidence: float,
-) -> Tuple[Dict[str, Any], Dict[str, int]]:
-	"""Filter reflection candidates before applying to long-term memory.
-
-	This is intentionally pure (no logging) so callers can decide how to report.
-
-	Returns:
-	- gated_payload: the updated payload with candidates filtered
-	- stats: {"kept": int, "removed": int}
+# Candidate shapes accepted from reflection output: decoded JSON objects, or
+# schemas.MemoryCandidate when msgspec is installed.
+_CANDIDATE_CLASSES = (dict, *CANDIDATE_TYPES)
+
+# Phrasings that usually carry something worth remembering: first-person facts
+# and preferences, explicit requests to remember, numbers and dates, and
+# capitalized names mid-sentence.
+_FACT_SIGNAL_RE = re.compile(
+	r"\b(?:i am|i'm|im|my|mine|i (?:like|love|hate|prefer|want|need|work|live|have|use)|"
+	r"call me|remember|don't|never|always)\b"
+	r"|\d"
+	r"|(?-i:[^.!?\s]\s+[A-Z][a-z]{2,})",
+	re.IGNORECASE,
+)
+_RECENT_INPUTS_MAX = 1000
+# Normalized recent user inputs (insertion ordered, oldest first).
+_RECENT_INPUTS: "OrderedDict[str, None]" = OrderedDict()
+_RECENT_INPUTS_LOCK = threading.Lock()
+
+
+def should_reflect(user_input: str, output: str) -> bool:
+	"""Cheap pre-check: is this turn worth a reflection LLM call?
+
+	Skips exact repeats of a recent input, and short turns with no sign of a
+	fact or preference. Reflection reads the last few messages, so a skipped
+	turn is still seen by the next reflection that does run.
 	"""
-	stats = {"kept": 0, "removed": 0}
-	if not isinstance(payload, dict):
-		return payload, stats
-
-	candidates = payload.get("candidates", [])
-	if not isinstance(candidates, list):
-		return payload, stats
-
-	kept: List[Dict[str, Any]] = []
-	removed = 0
-	for candidate in candidates:
-		if not isinstance(candidate, dict):
-			removed += 1
-			continue
-		confidence = candidate.get("confidence", 0.0)
-		try:
-			confidence_value = float(confidence)
-		except (TypeError, ValueError):
-			removed += 1
-			continue
-		if confidence_value >= min_confidence:
-			kept.append(candidate)
-		else:
-			removed += 1
-
-	payload["candidates"] = kept
-	stats["kept"] = len(kept)
-	stats["removed"] = removed
-	return payload, stats
+	key = " ".join(user_input.lower().split())
+	with _RECENT_INPUTS_LOCK:
+		if key in _RECENT_INPUTS:
+			_RECENT_INPUTS.move_to_end(key)
+			return False
+		_RECENT_INPUTS[key] = None
+		if len(_RECENT_INPUTS) > _RECENT_INPUTS_MAX:
+			_RECENT_INPUTS.popitem(last=False)
+
+	if _FACT_SIGNAL_RE.search(user_input):
+		return True
+	return len(user_input) + len(output) >= REFLECTION_MIN_CHARS
 
 
 def _now_iso() -> str:
-	return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+	# time.strftime on a struct_time avoids building a datetime per call.
+	return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+
+
+# Process-wide sequence appended to ids so two calls in the same nanosecond tick
+# still differ.
+_ID_COUNTER = itertools.count()
 
 
 def _new_memory_id() -> str:
-	# Collision-resistant enough for local use; lexicographically sortable.
-	return f"mem_{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ%f')}"
+	# Collision-resistant enough for local use. Fixed-width fields, so these ids
+	# sort in creation order among themselves; they do not sort consistently
+	# with legacy "mem_<YYYYMMDD>T..." ids.
+	return f"mem_{time.time_ns():016x}_{next(_ID_COUNTER):08x}"
 
 
 def _new_event_id() -> str:
-	return f"evt_{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ%f')}"
+	return f"evt_{time.time_ns():016x}_{next(_ID_COUNTER):08x}"
 
 
 def _append_revision_log(entry: Dict[str, Any]) -> None:
 	REVISION_LOG_PATH.parent.mkdir(parents=True, exist_ok=True)
-	with REVISION_LOG_PATH.open("a", encoding="utf-8", newline="\n") as f:
-		f.write(json.dumps(entry, ensure_ascii=False))
-		f.write("\n")
+	with REVISION_LOG_PATH.open("ab") as f:
+		f.write(fast_json.dumps_bytes(entry) + b"\n")
+
+
 
 
 
+def _file_stamp(path: Path) -> Optional[Tuple[int, int]]:
+	try:
+		st = path.stat()
+	except FileNotFoundError:
+		return None
+	return (st.st_mtime_ns, st.st_size)
+
+
+def _read_ltm_file(store_path: Path, size: int) -> Optional[List[Dict[str, Any]]]:
+	"""Parse the store file; None when it is not a valid JSON array."""
+	if IJSON_AVAILABLE and size > LTM_STREAM_THRESHOLD_BYTES:
+		try:
+			with store_path.open("rb") as f:
+				return list(ijson.items(f, "item", use_float=True))
+		except ijson.JSONError:
+			pass  # e.g. NaN literals; retry with the lenient full parse
+	try:
+		data = fast_json.loads(store_path.read_bytes())
+	except json.JSONDecodeError:
+		return None
+	return data if isinstance(data, list) else None
+
+
+def _load_ltm_cached(
+	store_path: Path, *, for_update: bool = False
+) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+	"""Return the cached (items, idx) for a store, re-reading only on change.
+
+	The returned list is the cached object itself; callers that mutate it must
+	persist through `save_ltm` so the cache stays in sync with the file.
+
+	A store that cannot be parsed reads as empty (and is not cached). With
+	`for_update` it raises RuntimeError instead, so it is never overwritten.
+	"""
+	store_path.parent.mkdir(parents=True, exist_ok=True)
+	stamp = _file_stamp(store_path)
+	if stamp is None or stamp[1] == 0:
+		_LTM_CACHE.pop(store_path, None)
+		return [], {}
+
+	cached = _LTM_CACHE.get(store_path)
+	if cached is not None and cached[0] == stamp:
+		return cached[1], cached[2]
+
+	items = _read_ltm_file(store_path, stamp[1])
+	if items is None:
+		_LTM_CACHE.pop(store_path, None)
+		if for_update:
+			raise RuntimeError(f"Long-term memory store {store_path} could not be parsed; not overwriting it")
+		return [], {}
+	idx = _index_by_id(items)
+	_LTM_CACHE[store_path] = (stamp, items, idx)
+	return items, idx
 
 
 def load_ltm(path: Optional[Path] = None) -> List[Dict[str, Any]]:
 	"""Load the long-term memory store.
 
-	The file contains a JSON array of memory objects.
+	The file contains a JSON array of memory objects. The parsed store is cached
+	per process; a shallow copy is returned so callers can reorder or filter
+	the list freely (the item dicts themselves are shared).
 	"""
-	store_path = path or LTM_PATH
-	store_path.parent.mkdir(parents=True, exist_ok=True)
-	if not store_path.exists() or store_path.stat().st_size == 0:
-		return []
-	try:
-		data = json.loads(store_path.read_text(encoding="utf-8"))
-	except json.JSONDecodeError:
-		# If the file is corrupt, fail safe by starting fresh.
-		return []
-	return data if isinstance(data, list) else []
+	items, _ = _load_ltm_cached(path or LTM_PATH)
+	return list(items)
 
 def load_sanitized_ltm(path: Optional[Path] = None) -> List[Dict[str, Any]]:
 	items = load_ltm(path)
@@ -135,10 +215,143 @@ def load_sanitized_ltm(path: Optional[Path] = None) -> List[Dict[str, Any]]:
     ## TODO remove deactivated items here
 	return sorted_items
 
+class _SearchIndex(NamedTuple):
+	# token -> positions in the LTM list of items mentioning it
+	postings: Dict[str, set]
+	# position -> its tokens, so a changed item can be re-indexed
+	tokens: Dict[int, set]
+	# parsed confidence per position (0.0 when missing/invalid)
+	confidence: Dict[int, float]
+	# positions of usable items, most recently updated first
+	by_recency: List[int]
+
+
+# Search index per store path and the file stamp it matches. Built on first
+# search (or after the file changed outside this process) and then kept up to
+# date in place by apply_memory_updates.
+_SEARCH_INDEX_CACHE: Dict[Path, Tuple[Tuple[int, int], _SearchIndex]] = {}
+
+
+def _tokenize(text: str) -> set:
+	return set(_TOKEN_RE.findall(text.lower()))
+
+
+def _recency_key(items: List[Dict[str, Any]], i: int) -> tuple:
+	item = items[i]
+	return (str(item.get("last_updated", "")), str(item.get("created_at", "")))
+
+
+def _index_item(index: _SearchIndex, items: List[Dict[str, Any]], i: int) -> bool:
+	"""Add position `i` to the postings; False if the item is not searchable."""
+	item = items[i]
+	if not isinstance(item, dict) or not str(item.get("content", "")).strip():
+		return False
+	index.confidence[i] = _safe_float(item.get("confidence", 0.0), default=0.0)
+	tokens = _tokenize(f"{item.get('subject', '')} {item.get('type', '')} {item.get('content', '')}")
+	index.tokens[i] = tokens
+	for token in tokens:
+		index.postings.setdefault(token, set()).add(i)
+	return True
+
+
+def _build_search_index(items: List[Dict[str, Any]]) -> _SearchIndex:
+	index = _SearchIndex({}, {}, {}, [])
+	for i in range(len(items)):
+		_index_item(index, items, i)
+	index.by_recency.extend(sorted(index.confidence, key=lambda i: _recency_key(items, i), reverse=True))
+	return index
+
+
+def _reindex_positions(index: _SearchIndex, items: List[Dict[str, Any]], positions: set) -> None:
+	"""Update `index` in place for items added or changed at `positions`."""
+	for i in positions:
+		for token in index.tokens.pop(i, ()):
+			posting = index.postings[token]
+			posting.discard(i)
+			if not posting:
+				del index.postings[token]
+		index.confidence.pop(i, None)
+	searchable = [i for i in positions if _index_item(index, items, i)]
+	# Changed items were just stamped with the current time, so they go first.
+	searchable.sort(key=lambda i: _recency_key(items, i), reverse=True)
+	index.by_recency[:] = searchable + [i for i in index.by_recency if i not in positions]
+
+
+def _update_search_index(
+	store_path: Path,
+	old_stamp: Optional[Tuple[int, int]],
+	items: List[Dict[str, Any]],
+	positions: set,
+) -> None:
+	"""Carry the cached search index over a save by re-indexing only `positions`.
+
+	Caller holds _LTM_LOCK. If the cached index did not match the store as it
+	was before the save, it is dropped and rebuilt on the next search.
+	"""
+	cached = _SEARCH_INDEX_CACHE.pop(store_path, None)
+	ltm_cached = _LTM_CACHE.get(store_path)
+	if cached is None or old_stamp is None or cached[0] != old_stamp or ltm_cached is None:
+		return
+	_reindex_positions(cached[1], items, positions)
+	_SEARCH_INDEX_CACHE[store_path] = (ltm_cached[0], cached[1])
+
+
+def search_ltm(
+	query: str,
+	*,
+	k: int,
+	min_confidence: float = 0.0,
+	path: Optional[Path] = None,
+) -> List[Dict[str, Any]]:
+	"""Return up to `k` memories for `query`, most relevant first.
+
+	Memories sharing the most words with the query win (ties go to higher
+	confidence); remaining slots are filled with the most recently updated
+	memories. Items below `min_confidence` or without content are skipped.
+	"""
+	if k <= 0:
+		return []
+	store_path = path or LTM_PATH
+	# Held throughout: apply_memory_updates updates the index in place.
+	with _LTM_LOCK:
+		items, _ = _load_ltm_cached(store_path)
+		stamp = _file_stamp(store_path)
+		cached = _SEARCH_INDEX_CACHE.get(store_path)
+		if stamp is not None and cached is not None and cached[0] == stamp:
+			index = cached[1]
+		else:
+			index = _build_search_index(items)
+			if stamp is not None:
+				_SEARCH_INDEX_CACHE[store_path] = (stamp, index)
+
+		confidence = index.confidence
+		scores: Dict[int, int] = {}
+		for token in _tokenize(query):
+			for i in index.postings.get(token, ()):
+				scores[i] = scores.get(i, 0) + 1
+
+		chosen = heapq.nlargest(
+			k,
+			(i for i in scores if confidence[i] >= min_confidence),
+			key=lambda i: (scores[i], confidence[i]),
+		)
+		if len(chosen) < k:
+			seen = set(chosen)
+			for i in index.by_recency:
+				if i not in seen and confidence[i] >= min_confidence:
+					chosen.append(i)
+					if len(chosen) >= k:
+						break
+		return [items[i] for i in chosen]
+
+
 def save_ltm(items: List[Dict[str, Any]], path: Optional[Path] = None) -> Path:
 	store_path = path or LTM_PATH
 	store_path.parent.mkdir(parents=True, exist_ok=True)
-	store_path.write_text(json.dumps(items, ensure_ascii=False, indent=2), encoding="utf-8")
+	atomic_write_bytes(store_path, fast_json.dumps_bytes(items, indent=True))
+	stamp = _file_stamp(store_path)
+	if stamp is not None:
+		_LTM_CACHE[store_path] = (stamp, items, _index_by_id(items))
 	return store_path
 
 
@@ -373,6 +586,7 @@ def _apply_create_candidate(
 def _apply_reinforce_candidate(
 	*,
 	items: List[Dict[str, Any]],
+	touched: set,
 	log_entries: List[Dict[str, Any]],
 	source_session_id: Optional[str],
 	cand_type: str,
@@ -415,6 +629,7 @@ def _apply_reinforce_candidate(
 	existing = items[matched_i]
 	if not isinstance(existing, dict):
 		return False
+	touched.add(matched_i)
 
 	existing_id = str(existing.get("id", ""))
 	before_confidence = existing.get("confidence")
@@ -453,52 +668,116 @@ def _apply_reinforce_candidate(
 	return True
 
 
+class _Cand(NamedTuple):
+	action: Any
+	type: str
+	subject: str
+	content: str
+	reason: str
+	# None when the raw value could not be parsed as a float.
+	confidence: Optional[float]
+
+
+def _candidate_confidence(cand: Any) -> Optional[float]:
+	"""A candidate's confidence as a float, or None when it cannot be parsed."""
+	raw = cand.get("confidence", 0.0) if isinstance(cand, dict) else cand.confidence
+	# Decoded JSON numbers (the normal case) skip the float() parse and its try.
+	if raw.__class__ is float:
+		return raw
+	try:
+		return float(raw)
+	except (TypeError, ValueError):
+		return None
+
+
+def _passes_gate(confidence: Optional[float], min_confidence: Optional[float]) -> bool:
+	"""The confidence gate for candidates: no gate keeps everything, otherwise
+	unparseable (None) and NaN confidences are dropped along with low ones."""
+	return min_confidence is None or (confidence is not None and confidence >= min_confidence)
+
+
+def _coerce_candidate(cand: Any) -> _Cand:
+	"""Read and coerce every field of a reflection candidate in one pass."""
+	if not isinstance(cand, dict):
+		# Already typed and validated by schemas.decode_reflection.
+		return _Cand(cand.action, cand.type, cand.subject, cand.content, cand.reason, _candidate_confidence(cand))
+	get = cand.get
+	return _Cand(
+		get("action"),
+		str(get("type", "")),
+		str(get("subject", "")),
+		str(get("content", "")),
+		str(get("reason", "")),
+		_candidate_confidence(cand),
+	)
+
+
 def _apply_candidates(
 	*,
 	items: List[Dict[str, Any]],
+	touched: set,
 	candidates: List[Any],
 	log_entries: List[Dict[str, Any]],
 	source_session_id: Optional[str],
+	min_confidence: Optional[float],
+	stats: Dict[str, int],
 ) -> bool:
 	changed = False
+	# Local counters, folded into `stats` once after the loop.
+	kept = removed = 0
 	for cand in candidates:
-		if not isinstance(cand, dict):
+		if not isinstance(cand, _CANDIDATE_CLASSES):
+			removed += 1
+			continue
+		c = _coerce_candidate(cand)
+		confidence = c.confidence
+		if not _passes_gate(confidence, min_confidence):
+			removed += 1
 			continue
-		action = cand.get("action")
-		cand_type = str(cand.get("type", ""))
-		subject = str(cand.get("subject", ""))
-		content = str(cand.get("content", ""))
-		reason = str(cand.get("reason", ""))
-		confidence = _safe_float(cand.get("confidence", 0.0), default=0.0)
-
-		if action == "create":
+		kept += 1
+		if confidence is None:
+			confidence = 0.0
+
+		if c.action == "create":
 			changed |= _apply_create_candidate(
 				items=items,
 				log_entries=log_entries,
 				source_session_id=source_session_id,
-				cand_type=cand_type,
-				subject=subject,
-				content=content,
+				cand_type=c.type,
+				subject=c.subject,
+				content=c.content,
 				confidence=confidence,
-				reason=reason,
+				reason=c.reason,
 			)
-		elif action == "reinforce":
+		elif c.action == "reinforce":
 			changed |= _apply_reinforce_candidate(
 				items=items,
+				touched=touched,
 				log_entries=log_entries,
 				source_session_id=source_session_id,
-				cand_type=cand_type,
-				subject=subject,
-				content=content,
+				cand_type=c.type,
+				subject=c.subject,
+				content=c.content,
 				confidence=confidence,
-				reason=reason,
+				reason=c.reason,
 			)
+	stats["kept"] += kept
+	stats["removed"] += removed
 	return changed
 
 
+class _Rev(NamedTuple):
+	target_id: Any
+	action: Any
+	new_confidence: Any
+	reason: Any
+	content: Any
+
+
 def _apply_revisions(
 	*,
 	items: List[Dict[str, Any]],
+	touched: set,
 	idx: Dict[str, int],
 	revisions: List[Any],
 	log_entries: List[Dict[str, Any]],
@@ -506,22 +785,28 @@ def _apply_revisions(
 ) -> bool:
 	changed = False
 	for rev in revisions:
-		if not isinstance(rev, dict):
+		if isinstance(rev, dict):
+			r = _Rev(rev.get("target_id"), rev.get("action"), rev.get("new_confidence"), rev.get("reason", ""), rev.get("content"))
+		elif isinstance(rev, REVISION_TYPES):
+			r = _Rev(rev.target_id, rev.action, rev.new_confidence, rev.reason, rev.content)
+		else:
 			continue
-		target_id = rev.get("target_id")
+		target_id = r.target_id
 		if not isinstance(target_id, str) or target_id not in idx:
 			continue
-		item = items[idx[target_id]]
+		pos = idx[target_id]
+		item = items[pos]
 		if not isinstance(item, dict):
 			continue
-		action = rev.get("action")
-		new_conf_raw = rev.get("new_confidence", item.get("confidence", 0.0))
+		action = r.action
+		new_conf_raw = r.new_confidence if r.new_confidence is not None else item.get("confidence", 0.0)
 		try:
 			new_conf = float(new_conf_raw)
 		except (TypeError, ValueError):
 			continue
 
 		if action in {"decrease_confidence", "increase_confidence"}:
+			touched.add(pos)
 			before_confidence = item.get("confidence")
 			item["confidence"] = new_conf
 			item["last_updated"] = _now_iso()
@@ -533,14 +818,15 @@ def _apply_revisions(
 				before_confidence=before_confidence,
 				new_confidence=new_conf,
 				last_updated=str(item.get("last_updated", "")),
-				reason=str(rev.get("reason", "")),
+				reason=str(r.reason),
 			)
 			changed = True
 		elif action == "revise":
+			touched.add(pos)
 			before_confidence = item.get("confidence")
 			before_content = item.get("content")
-			if isinstance(rev.get("content"), str):
-				item["content"] = rev["content"]
+			if isinstance(r.content, str):
+				item["content"] = r.content
 			item["confidence"] = new_conf
 			item["last_updated"] = _now_iso()
 			_log_revision_revise(
@@ -552,7 +838,7 @@ def _apply_revisions(
 				new_confidence=new_conf,
 				after_content=item.get("content"),
 				last_updated=str(item.get("last_updated", "")),
-				reason=str(rev.get("reason", "")),
+				reason=str(r.reason),
 			)
 			changed = True
 
@@ -560,45 +846,79 @@ def _apply_revisions(
 
 
 def apply_memory_updates(
-	updates: Dict[str, Any],
+	updates: Any,
 	*,
 	path: Optional[Path] = None,
 	source_session_id: Optional[str] = None,
-) -> List[Dict[str, Any]]:
+	min_confidence: Optional[float] = None,
+) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
 	"""Apply reflection candidates + revisions into LTM and persist.
 
-	Expected shape:
+	Expected shape (a dict, or a schemas.ReflectionPayload with the same fields):
 	{
 	  "candidates": [...],
 	  "revisions": [...]
 	}
-	"""
-	items = load_ltm(path)
-	idx = _index_by_id(items)
-	changed = False
-	log_entries: List[Dict[str, Any]] = []
 
-	candidates = updates.get("candidates", [])
-	if isinstance(candidates, list):
-		changed |= _apply_candidates(
-			items=items,
-			candidates=candidates,
-			log_entries=log_entries,
-			source_session_id=source_session_id,
-		)
+	When `min_confidence` is set, candidates below it (or with an unparseable
+	confidence) are skipped while applying; see `_passes_gate`.
 
-	revisions = updates.get("revisions", [])
-	if isinstance(revisions, list):
-		changed |= _apply_revisions(
-			items=items,
-			idx=idx,
-			revisions=revisions,
-			log_entries=log_entries,
-			source_session_id=source_session_id,
-		)
+	Returns:
+	- items: the updated memory list
+	- stats: {"kept": int, "removed": int} for the candidate gate
+	"""
+	store_path = path or LTM_PATH
+	with _LTM_LOCK:
+		# Work on the cached list in place; save_ltm refreshes the cache entry.
+		items, idx = _load_ltm_cached(store_path, for_update=True)
+		old_stamp = _LTM_CACHE[store_path][0] if store_path in _LTM_CACHE else None
+		old_len = len(items)
+		# Positions of existing items changed in place (appends are past old_len).
+		touched: set = set()
+		changed = False
+		log_entries: List[Dict[str, Any]] = []
+		stats = {"kept": 0, "removed": 0}
 
-	if changed:
-		save_ltm(items, path)
-		for entry in log_entries:
-			_append_revision_log(entry)
-	return items
\ No newline at end of file
+		try:
+			if isinstance(updates, dict):
+				candidates = updates.get("candidates", [])
+				revisions = updates.get("revisions", [])
+			else:
+				candidates = updates.candidates
+				revisions = updates.revisions
+
+			if isinstance(candidates, list):
+				changed |= _apply_candidates(
+					items=items,
+					touched=touched,
+					candidates=candidates,
+					log_entries=log_entries,
+					source_session_id=source_session_id,
+					min_confidence=min_confidence,
+					stats=stats,
+				)
+
+			if isinstance(revisions, list):
+				changed |= _apply_revisions(
+					items=items,
+					touched=touched,
+					idx=idx,
+					revisions=revisions,
+					log_entries=log_entries,
+					source_session_id=source_session_id,
+				)
+
+			if changed:
+				save_ltm(items, store_path)
+		except Exception:
+			# The cached list may have been mutated without being persisted (an
+			# apply step or the save failed); drop it so the next load re-reads disk.
+			_LTM_CACHE.pop(store_path, None)
+			raise
+
+		if changed:
+			touched.update(range(old_len, len(items)))
+			_update_search_index(store_path, old_stamp, items, touched)
+			for entry in log_entries:
+				_append_revision_log(entry)
+		return list(items), stats
\ No newline at end of file
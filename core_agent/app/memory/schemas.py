@@ -0,0 +1,64 @@
+"""Typed reflection payload schemas.
+
+When msgspec is installed, reflection output is parsed and validated into
+Structs in one pass. Without it (or when the output does not fit the schema)
+decoding falls back to plain dicts, which memory_system also accepts.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional, Union
+
+from ..utils import fast_json
+
+try:
+	import msgspec
+	MSGSPEC_AVAILABLE = True
+except ImportError:
+	MSGSPEC_AVAILABLE = False
+
+
+if MSGSPEC_AVAILABLE:
+
+	class MemoryCandidate(msgspec.Struct):
+		action: str = ""
+		type: str = ""
+		subject: str = ""
+		content: str = ""
+		confidence: Optional[float] = 0.0
+		reason: str = ""
+
+	class MemoryRevision(msgspec.Struct):
+		target_id: str = ""
+		action: str = ""
+		new_confidence: Optional[float] = None
+		reason: str = ""
+		content: Optional[str] = None
+
+	class ReflectionPayload(msgspec.Struct):
+		candidates: List[MemoryCandidate] = []
+		revisions: List[MemoryRevision] = []
+
+	# strict=False lets numeric strings like "0.8" decode into float fields.
+	_DECODER = msgspec.json.Decoder(ReflectionPayload, strict=False)
+
+	CANDIDATE_TYPES: tuple = (MemoryCandidate,)
+	REVISION_TYPES: tuple = (MemoryRevision,)
+else:
+	CANDIDATE_TYPES = ()
+	REVISION_TYPES = ()
+
+
+def decode_reflection(data: Union[str, bytes]) -> Union["ReflectionPayload", Dict[str, Any]]:
+	"""Decode reflection output into a ReflectionPayload, or a dict as fallback.
+
+	Raises json.JSONDecodeError when the output is not JSON at all.
+	"""
+	if MSGSPEC_AVAILABLE:
+		try:
+			return _DECODER.decode(data)
+		except msgspec.DecodeError:
+			# Off-schema but possibly valid JSON: let the lenient dict path
+			# salvage what it can (and report invalid JSON as usual).
+			pass
+	return fast_json.loads(data)
@@ -1,47 +1,90 @@
 from __future__ import annotations
 
+import atexit
+import itertools
 import json
+import os
+import queue
+import threading
+import time
 import uuid
+from collections import deque
 from dataclasses import dataclass, field
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Deque, Dict, List, Optional
 from ..core.contracts import SessionMessage
 
-from ..config import SESSIONS_DIR, MAX_SCREEN_CONTEXTS
+from ..config import SESSIONS_DIR, MAX_SCREEN_CONTEXTS, SESSION_FLUSH_DELAY
+from ..utils import fast_json
+from ..utils.atomic_write import atomic_write_bytes
+from ..utils.executors import IO_POOL
+from ..utils.logger import get_logger
+
+logger = get_logger(__name__)
 
 ISO_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
 
+# A session is a JSON snapshot plus an append-only JSONL log of messages added
+# since. The log is folded back into the snapshot once it holds more than
+# LOG_COMPACT_RATIO x the snapshot's messages (and at least LOG_COMPACT_MIN).
+LOG_COMPACT_RATIO = 2
+LOG_COMPACT_MIN = 16
+
+# Orders snapshot rewrites against log appends so a compaction never drops a
+# line appended while it was running.
+_IO_LOCK = threading.Lock()
+# Sessions with a background compaction queued (guarded by _IO_LOCK).
+_COMPACTING: set[str] = set()
+
+# Id of the newest session found by the last directory scan, so repeated
+# load_latest_session calls skip the listdir. Only create_new_session can make
+# it stale within this process, and it clears it.
+_LATEST_SID_CACHE: Optional[str] = None
+
+# (timestamp id, suffix) of the last session id handed out, so two sessions
+# created within the same second still get distinct ids.
+_LAST_ISSUED: tuple[str, int] = ("", 0)
+_ID_LOCK = threading.Lock()
+
 
 @dataclass
 class Session:
 	session_id: str
 	created_at: datetime
 	last_updated: datetime
-	messages: List[Dict[str, Any]] = field(default_factory=list)
+	messages: Deque[Dict[str, Any]] = field(default_factory=deque)
 	summary: str = ""
+	# Messages before this index are covered by `summary`.
+	summary_frontier: int = 0
 	file_path: Optional[Path] = None
 	screen_contexts: List[Dict[str, Any]] = field(default_factory=list)
 	active_screen_context_id: Optional[str] = None
+	# Lines in the JSONL log not yet folded into the snapshot (not persisted).
+	log_count: int = field(default=0, repr=False)
 
 	def to_dict(self) -> Dict[str, object]:
 		return {
 			"session_id": self.session_id,
 			"created_at": timestamp_to_iso(self.created_at),
 			"last_updated": timestamp_to_iso(self.last_updated),
-			"messages": self.messages,
+			"messages": list(self.messages),
 			"summary": self.summary,
+			"summary_frontier": self.summary_frontier,
 			"screen_contexts": self.screen_contexts,
 			"active_screen_context_id": self.active_screen_context_id,
 		}
 
 
 def timestamp_to_iso(value: datetime) -> str:
-	return value.astimezone(timezone.utc).strftime(ISO_FORMAT)
+	# Equivalent to strftime(ISO_FORMAT) without the format-string parsing.
+	v = value.astimezone(timezone.utc)
+	return f"{v.year:04d}-{v.month:02d}-{v.day:02d}T{v.hour:02d}:{v.minute:02d}:{v.second:02d}Z"
 
 
 def iso_to_datetime(value: str) -> datetime:
-	return datetime.strptime(value, ISO_FORMAT).replace(tzinfo=timezone.utc)
+	# fromisoformat only accepts a trailing "Z" from 3.11 on, so strip it.
+	return datetime.fromisoformat(value.rstrip("Z")).replace(tzinfo=timezone.utc)
 
 
 def _ensure_sessions_dir() -> None:
@@ -53,14 +96,39 @@ def _session_path(session_id: str) -> Path:
 	return SESSIONS_DIR / f"{session_id}.json"
 
 
+def _log_path(snapshot_path: Path) -> Path:
+	return snapshot_path.with_suffix(".jsonl")
+
+
 def _now() -> datetime:
 	return datetime.now(timezone.utc)
 
 
+def _next_session_id(base: str) -> str:
+	"""`base`, or `base_NNN` when another session already took it.
+
+	Ids are only written to disk on the first save, so ids handed out in this
+	process are tracked as well as files on disk.
+	"""
+	global _LAST_ISSUED
+	with _ID_LOCK:
+		last_base, n = _LAST_ISSUED
+		n = n + 1 if last_base == base else 0
+		session_id = f"{base}_{n:03d}" if n else base
+		while _session_path(session_id).exists():
+			n += 1
+			session_id = f"{base}_{n:03d}"
+		_LAST_ISSUED = (base, n)
+	return session_id
+
+
 def create_new_session() -> Session:
+	global _LATEST_SID_CACHE
+	# The new session becomes the latest once saved; rescan on the next lookup.
+	_LATEST_SID_CACHE = None
 	now = _now()
-	session_id = f"session_{now.strftime('%Y%m%dT%H%M%SZ')}"
-	messages = []
+	session_id = _next_session_id(f"session_{now.strftime('%Y%m%dT%H%M%SZ')}")
+	messages: Deque[Dict[str, Any]] = deque()
 	session = Session(
 		session_id=session_id,
 		created_at=now,
@@ -78,6 +146,64 @@ def append_message(session: Session, msg: SessionMessage) -> None:
     session.last_updated = _now()
 
 
+def append_messages_to_log(session: Session, msgs: List[SessionMessage]) -> None:
+    """Append messages in memory and persist only them.
+
+    Each message becomes one line in the session's JSONL log, tagged with its
+    index so replays skip anything a snapshot already contains. The lines are
+    handed to the persist queue, which writes them within one batching window.
+    A session without a snapshot on disk yet is saved in full, right away. Once
+    the log outgrows the snapshot, a compaction is queued in the background.
+    """
+    with _IO_LOCK:
+        start = len(session.messages)
+        for msg in msgs:
+            append_message(session, msg)
+        path = session.file_path or _session_path(session.session_id)
+        if not path.exists():
+            _save_session_locked(session)
+            return
+        ts = timestamp_to_iso(session.last_updated)
+        messages = session.messages
+        data = b"".join(
+            fast_json.dumps_bytes({"i": i, "ts": ts, "message": messages[i]}) + b"\n"
+            for i in range(start, len(messages))
+        )
+        _PERSIST_QUEUE.submit_log(_log_path(path), data)
+        session.log_count += len(messages) - start
+
+        snapshot_count = len(messages) - session.log_count
+        if _log_needs_compaction(session, snapshot_count) and session.session_id not in _COMPACTING:
+            try:
+                IO_POOL.submit(_compact_session, session)
+                _COMPACTING.add(session.session_id)
+            except RuntimeError:
+                pass  # shutting down; the next load compacts instead
+
+
+def _log_needs_compaction(session: Session, snapshot_count: int) -> bool:
+    return session.log_count > max(LOG_COMPACT_RATIO * snapshot_count, LOG_COMPACT_MIN)
+
+
+def _compact_session(session: Session) -> None:
+    """Fold the session's JSONL log into a fresh snapshot."""
+    with _IO_LOCK:
+        _COMPACTING.discard(session.session_id)
+        try:
+            _save_session_locked(session)
+        except RuntimeError as exc:
+            logger.error("%s", exc)
+
+
+def recent_messages(session: Session, limit: int) -> List[Dict[str, Any]]:
+    """Return the last `limit` messages, oldest first, in O(limit)."""
+    if limit <= 0:
+        return []
+    tail = list(itertools.islice(reversed(session.messages), limit))
+    tail.reverse()
+    return tail
+
+
 def append_user_message(session: Session, text: str, *, meta: Optional[Dict[str, Any]] = None) -> None:
     append_message(session, SessionMessage(role="user", content=text, meta=meta))
 
@@ -146,27 +272,66 @@ def clear_screen_contexts(session: Session) -> None:
     session.last_updated = _now()
     
 def save_session(session: Session) -> Path:
+	"""Write a full snapshot of the session and drop its JSONL log."""
+	with _IO_LOCK:
+		return _save_session_locked(session)
+
+
+def _save_session_locked(session: Session) -> Path:
 	path = session.file_path or _session_path(session.session_id)
 	try:
-		path.write_text(json.dumps(session.to_dict(), indent=2))
+		atomic_write_bytes(path, fast_json.dumps_bytes(session.to_dict(), indent=True))
+		# Everything in the log is now part of the snapshot.
+		_log_path(path).unlink(missing_ok=True)
 	except Exception as e:
 		raise RuntimeError(f"Failed to save session {session.session_id}: {e}") from e
 	session.file_path = path
+	session.log_count = 0
 	return path
 
 
+def _replay_log(session: Session, log_path: Path) -> None:
+	"""Apply JSONL log lines written after the snapshot was taken."""
+	try:
+		f = log_path.open("rb")
+	except FileNotFoundError:
+		return
+	with f:
+		for raw_line in f:
+			try:
+				entry = fast_json.loads(raw_line)
+				index = entry["i"]
+				message = entry["message"]
+			except (json.JSONDecodeError, KeyError, TypeError):
+				# A torn final line from a crash mid-append; nothing after it is valid.
+				break
+			session.log_count += 1
+			if index < len(session.messages):
+				continue  # already folded into the snapshot
+			if index > len(session.messages):
+				break
+			session.messages.append(message)
+			if entry.get("ts"):
+				session.last_updated = iso_to_datetime(entry["ts"])
+
+
 def load_session(path: Path) -> Session:
-	raw = json.loads(path.read_text())
+	raw = fast_json.loads(path.read_bytes())
 	session = Session(
 		session_id=raw["session_id"],
 		created_at=iso_to_datetime(raw["created_at"]),
 		last_updated=iso_to_datetime(raw["last_updated"]),
-		messages=raw.get("messages", []),
+		messages=deque(raw.get("messages", [])),
 		summary=raw.get("summary", ""),
+		summary_frontier=raw.get("summary_frontier", 0),
 		screen_contexts=raw.get("screen_contexts", []),
 		active_screen_context_id=raw.get("active_screen_context_id"),
 		file_path=path,
 	)
+	snapshot_count = len(session.messages)
+	_replay_log(session, _log_path(path))
+	if _log_needs_compaction(session, snapshot_count):
+		save_session(session)
 	return session
 
 def _cap_screen_contexts(contexts: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
@@ -180,14 +345,158 @@ def _cap_screen_contexts(contexts: List[Dict[str, Any]]) -> List[Dict[str, Any]]
 
 def _session_files() -> List[Path]:
 	_ensure_sessions_dir()
-	return sorted(SESSIONS_DIR.glob("session_*.json"), key=lambda p: p.stat().st_mtime)
+	# Session ids embed a UTC timestamp (session_YYYYMMDDTHHMMSSZ, plus _NNN for
+	# same-second collisions), so name order is creation order and no per-file
+	# stat() is needed.
+	return sorted(SESSIONS_DIR.glob("session_*.json"))
+
+
+class PersistQueue:
+	"""Batch session writes from many turns and sessions into few syscalls.
+
+	A background thread collects everything submitted within `window` seconds
+	of the first arrival, then writes each log file with one os.write and one
+	fdatasync, and each dirty session's snapshot once. `flush()` blocks until
+	everything submitted so far is on disk (also registered at exit). Until
+	then the in-memory Session is authoritative, so loaders should consult
+	`get_pending` first.
+	"""
+
+	def __init__(self, window: float) -> None:
+		self.window = window
+		# ("log", path, bytes) or ("snapshot", session_id, None)
+		self._q: queue.Queue = queue.Queue()
+		self._pending: Dict[str, Session] = {}
+		self._lock = threading.Lock()
+		self._thread: Optional[threading.Thread] = None
+
+	def _ensure_thread(self) -> None:
+		if self._thread is not None:
+			return
+		with self._lock:
+			if self._thread is None:
+				self._thread = threading.Thread(target=self._run, name="session-persist", daemon=True)
+				self._thread.start()
+
+	def submit_log(self, path: Path, data: bytes) -> None:
+		self._ensure_thread()
+		self._q.put(("log", path, data))
+
+	def mark_dirty(self, session: Session) -> None:
+		"""Schedule a full snapshot save of `session`."""
+		with self._lock:
+			queued = session.session_id in self._pending
+			self._pending[session.session_id] = session
+		if not queued:
+			self._ensure_thread()
+			self._q.put(("snapshot", session.session_id, None))
+
+	def get_pending(self, session_id: str) -> Optional[Session]:
+		with self._lock:
+			return self._pending.get(session_id)
+
+	def flush(self) -> None:
+		self._q.join()
+
+	def _run(self) -> None:
+		while True:
+			batch = [self._q.get()]
+			deadline = time.monotonic() + self.window
+			while True:
+				remaining = deadline - time.monotonic()
+				if remaining <= 0:
+					break
+				try:
+					batch.append(self._q.get(timeout=remaining))
+				except queue.Empty:
+					break
+			try:
+				self._write_batch(batch)
+			except Exception as exc:
+				logger.error("Session persist batch failed: %s", exc)
+			finally:
+				for _ in batch:
+					self._q.task_done()
+
+	def _write_batch(self, batch: list) -> None:
+		logs: Dict[Path, List[bytes]] = {}
+		snapshot_ids: List[str] = []
+		for kind, key, data in batch:
+			if kind == "log":
+				logs.setdefault(key, []).append(data)
+			else:
+				snapshot_ids.append(key)
+
+		for path, chunks in logs.items():
+			try:
+				with _IO_LOCK:
+					_append_bytes_durable(path, b"".join(chunks))
+			except OSError as exc:
+				logger.error("Failed to append session log %s: %s", path, exc)
+
+		for session_id in snapshot_ids:
+			with self._lock:
+				session = self._pending.pop(session_id, None)
+			if session is None:
+				continue
+			try:
+				save_session(session)
+			except RuntimeError as exc:
+				logger.error("%s", exc)
+
+
+_fdatasync = getattr(os, "fdatasync", os.fsync)
+
+
+def _append_bytes_durable(path: Path, data: bytes) -> None:
+	fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT | getattr(os, "O_BINARY", 0), 0o644)
+	try:
+		view = memoryview(data)
+		while view:
+			written = os.write(fd, view)
+			view = view[written:]
+		_fdatasync(fd)
+	finally:
+		os.close(fd)
 
 
-def load_latest_session() -> Optional[Session]:
+_PERSIST_QUEUE = PersistQueue(SESSION_FLUSH_DELAY)
+
+
+def _flush_at_exit() -> None:
+	# Background turns may still be submitting writes; let them finish first.
+	IO_POOL.shutdown(wait=True)
+	_PERSIST_QUEUE.flush()
+
+
+atexit.register(_flush_at_exit)
+
+
+def get_session_writer() -> PersistQueue:
+	return _PERSIST_QUEUE
+
+
+def latest_session_id() -> Optional[str]:
+	"""Id of the newest session on disk, scanning SESSIONS_DIR only on a cache miss."""
+	global _LATEST_SID_CACHE
+	if _LATEST_SID_CACHE is not None and _session_path(_LATEST_SID_CACHE).exists():
+		return _LATEST_SID_CACHE
+
 	files = _session_files()
-	if not files:
+	_LATEST_SID_CACHE = files[-1].stem if files else None
+	return _LATEST_SID_CACHE
+
+
+def _try_load_cached_latest() -> Optional[Session]:
+	"""Load the latest session, scanning SESSIONS_DIR only on a cache miss."""
+	session_id = latest_session_id()
+	if session_id is None:
 		return None
-	return load_session(files[-1])
+	return load_session_by_id(session_id)
+
+
+def load_latest_session() -> Optional[Session]:
+	return _try_load_cached_latest()
 
 def load_session_by_id(session_id: str) -> Optional[Session]:
     path = _session_path(session_id)
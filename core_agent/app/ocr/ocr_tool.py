@@ -32,6 +32,20 @@ def _clean_lines(lines: Sequence[str]) -> str:
     return text.strip()
 
 
+def _normalize_mixed(lines: list) -> list[str]:
+    # lines might be strings or lists depending on EasyOCR version;
+    # normalize to list[str]
+    normalized: list[str] = []
+    for item in lines:
+        if isinstance(item, str):
+            normalized.append(item)
+        elif isinstance(item, (list, tuple)):
+            normalized.extend([str(x) for x in item])
+        else:
+            normalized.append(str(item))
+    return normalized
+
+
 def capture_screen(monitor_index: int = 1) -> Image.Image:
     """Capture a full monitor screenshot using mss."""
     with mss.mss() as sct:
@@ -58,18 +72,12 @@ class EasyOcrEngine:
         # paragraph=True groups nearby text (usually nicer for UI screenshots)
         lines = self.reader.readtext(arr, detail=0, paragraph=True)
 
-        # lines might be strings or lists depending on EasyOCR version;
-        # normalize to list[str]
-        normalized: list[str] = []
-        for item in lines:
-            if isinstance(item, str):
-                normalized.append(item)
-            elif isinstance(item, (list, tuple)):
-                normalized.extend([str(x) for x in item])
-            else:
-                normalized.append(str(item))
-
-        return _clean_lines(normalized)
+        if not lines:
+            return ""
+        # Usually all strings already; only rebuild the list when some item isn't.
+        if all(isinstance(item, str) for item in lines):
+            return _clean_lines(lines)
+        return _clean_lines(_normalize_mixed(lines))
 
 
 def capture_and_ocr(engine: EasyOcrEngine, monitor_index: int = 1) -> ScreenContext:
@@ -1,17 +1,55 @@
+import itertools
 import json
-from .core.contracts import RunOptions, InitialResponseJson
-from typing import Callable, Optional, TypeVar
-from .config import MIN_MEMORY_CONFIDENCE
+import logging
+import threading
+import weakref
+from collections import OrderedDict
+from concurrent.futures import Future
+from .core.contracts import RunOptions, InitialResponseJson, SessionMessage
+from typing import Any, Callable, Optional, TypeVar
+from .config import (
+	COMBINED_REFLECTION,
+	MIN_MEMORY_CONFIDENCE,
+	REFLECTION_MESSAGE_LIMIT,
+	SUMMARY_CHUNK_MESSAGES,
+)
+from .utils import executors
+from .utils.lazy_import import lazy_import
 from .utils.logger import get_logger
 from .utils.prompt_dumper import get_prompt_dumper
-from .memory import memory_system
 from .memory import session as session_module
-from .llm import llm_router
-from .llm import prompts as prompt_module
-from .ocr.ocr_tool import capture_and_ocr, EasyOcrEngine
+
+# Loaded on first use so importing the runner (e.g. for `--help`) stays cheap.
+memory_system = lazy_import(f"{__package__}.memory.memory_system")
+schemas = lazy_import(f"{__package__}.memory.schemas")
+llm_router = lazy_import(f"{__package__}.llm.llm_router")
+prompt_module = lazy_import(f"{__package__}.llm.prompts")
 
 logger = get_logger(__name__)
 dumper = get_prompt_dumper()
+session_writer = session_module.get_session_writer()
+
+# session_id -> in-flight save+reflection task for that session's last turn.
+_PENDING_TURNS: dict[str, Future] = {}
+
+# session_id -> live Session. The in-memory copy is canonical; disk is the checkpoint.
+_SESSION_LRU: OrderedDict[str, session_module.Session] = OrderedDict()
+_SESSION_LRU_MAX = 16
+# Every Session still alive anywhere in the process (e.g. held by a pending
+# turn after leaving the LRU), so one id never maps to two diverging copies.
+_SESSION_CACHE: "weakref.WeakValueDictionary[str, session_module.Session]" = weakref.WeakValueDictionary()
+# session_id -> in-flight summary job for that session.
+_SUMMARIES: dict[str, Future] = {}
+
+# session_id -> last reflection queued for that session. Each one starts only
+# after the previous one is applied, so it sees the memories that one wrote.
+_REFLECTIONS: dict[str, Future] = {}
+_REFLECTIONS_LOCK = threading.Lock()
+
+# session_id -> lock serializing that session's background writes (turn save,
+# memory updates from its reflection). Entries vanish once no task holds them.
+_SESSION_LOCKS: "weakref.WeakValueDictionary[str, threading.Lock]" = weakref.WeakValueDictionary()
+_SESSION_LOCKS_GUARD = threading.Lock()
 
 T = TypeVar("T")
 # TODO find a place for Runner to live - is it in core?
@@ -25,11 +63,9 @@ class FatalStepError(Exception):
 def _fatal_step(label: str, fn: Callable[[], T], *, fallback_prefix: str) -> T:
     try:
         return fn()
-    except llm_router.OpenRouterError as exc:
-        logger.error("%s failed request: %s", label, exc)
-        raise FatalStepError(f"{fallback_prefix}: {exc}") from exc
     except Exception as exc:
-        logger.error("%s failed: %s", label, exc)
+        failure = "failed request" if isinstance(exc, llm_router.OpenRouterError) else "failed"
+        logger.error("%s %s: %s", label, failure, exc)
         raise FatalStepError(f"{fallback_prefix}: {exc}") from exc
 
 
@@ -48,8 +84,8 @@ def _nonfatal_step(label: str, fn: Callable[[], None]) -> None:
 		logger.warning("%s failed: %s", label, exc)
 
 def fallback_response(reason: str) -> tuple[InitialResponseJson, str]:
-	text = "Falling back to default response: %s", reason
-	logger.warning(text)
+	text = f"Falling back to default response: {reason}"
+	logger.warning("Falling back to default response: %s", reason)
 
 	fallback = InitialResponseJson(
 		display_text=text,
@@ -61,21 +97,61 @@ def fallback_response(reason: str) -> tuple[InitialResponseJson, str]:
 
 # SESSION MANAGEMENT
 
+def _wait_for_pending_turns() -> None:
+	"""Block until earlier turns finished appending to their sessions."""
+	while _PENDING_TURNS:
+		_, future = _PENDING_TURNS.popitem()
+		future.result()
+
+
+def _remember_session(session: session_module.Session) -> session_module.Session:
+	_SESSION_CACHE[session.session_id] = session
+	_SESSION_LRU[session.session_id] = session
+	_SESSION_LRU.move_to_end(session.session_id)
+	while len(_SESSION_LRU) > _SESSION_LRU_MAX:
+		# Still reachable through _SESSION_CACHE while a background job holds it.
+		_SESSION_LRU.popitem(last=False)
+	return session
+
+
+def _session_lock(session_id: str) -> threading.Lock:
+	with _SESSION_LOCKS_GUARD:
+		lock = _SESSION_LOCKS.get(session_id)
+		if lock is None:
+			lock = threading.Lock()
+			_SESSION_LOCKS[session_id] = lock
+		return lock
+
+
 def _get_session(new_session: bool, session_id: Optional[str]) -> session_module.Session:
+	_wait_for_pending_turns()
 	if new_session: # create a new session
 		logger.info("Starting new session")
-		return session_module.create_new_session()
+		return _remember_session(session_module.create_new_session())
 
 	session = None
-	if session_id: # try to load by id
-		session = session_module.load_session_by_id(session_id)
+	if session_id: # already live in this process
+		session = _SESSION_CACHE.get(session_id)
+		if session is not None:
+			logger.info("Reusing in-memory session %s", session_id)
+			return _remember_session(session)
+
+	if session_id: # try the unflushed copy first, then disk
+		session = session_writer.get_pending(session_id)
+		if session is None:
+			session_writer.flush()
+			session = session_module.load_session_by_id(session_id)
 		if session:
 			logger.info("Loaded session %s by id", session_id)
 		else:
 			logger.warning("Requested session %s not found; falling back", session_id)
 
-	if session is None: # load latest session
-		session = session_module.load_latest_session()
+	if session is None: # load latest session, reusing the live copy if there is one
+		session_writer.flush()
+		latest_id = session_module.latest_session_id()
+		session = _SESSION_CACHE.get(latest_id) if latest_id else None
+		if session is None:
+			session = session_module.load_latest_session()
 		if session:
 			logger.info("Loaded latest session %s", session.session_id)
 
@@ -83,48 +159,182 @@ def _get_session(new_session: bool, session_id: Optional[str]) -> session_module
 		logger.info("No sessions found; starting new session")
 		session = session_module.create_new_session()
 
-	return session
+	return _remember_session(session)
 
 def _append_messages_and_save(session: session_module.Session, user_input: str, agent_output: InitialResponseJson, context_added: bool = False) -> None:
 	if context_added:
 		user_input += f"\n[system note: fresh screen context was captured for this message]"
   
-	session_module.append_user_message(session, user_input)
-	session_module.append_message(session, agent_output.to_session_message())
-	session_module.save_session(session)
+	# Append-only: persist just the two new messages, in one write.
+	session_module.append_messages_to_log(
+		session,
+		[SessionMessage(role="user", content=user_input), agent_output.to_session_message()],
+	)
 	logger.info("Recorded turn for session %s", session.session_id)
-	
+
+
+def _persist_turn(
+	session: session_module.Session,
+	user_input: str,
+	agent_output: InitialResponseJson,
+	memory_updates: Optional[dict] = None,
+) -> None:
+	with _session_lock(session.session_id):
+		_nonfatal_step("Save turn", lambda: _append_messages_and_save(session, user_input, agent_output))
+	_nonfatal_step("Summary", lambda: _maybe_schedule_summary(session))
+	if memory_updates is not None:
+		# The combined call already reflected on this turn.
+		session_id = session.session_id
+		_queue_reflection(session_id, lambda: _apply_memory_payload(memory_updates, session_id))
+		return
+	if not memory_system.should_reflect(user_input, agent_output.display_text):
+		logger.info("Skipping reflection for trivial turn in session %s", session.session_id)
+		return
+	# Reflect only after the turn is recorded so it sees the persisted messages.
+	_handle_reflection_safe(session)
+
 
 # PROMPT CONSTRUCTION
 
-def _build_prompt(current_session: session_module.Session, user_input: str) -> list[dict[str, str]]:
-	prompt = prompt_module.construct_prompt(current_session, user_input)
-	logger.info("Constructed prompt with %d messages", len(prompt))
-	logger.debug("Prompt messages: %s", prompt)
+def _build_prompt(current_session: session_module.Session, user_input: str) -> tuple[list[dict[str, str]], list[int]]:
+	static, dynamic = prompt_module.construct_prompt_parts(current_session, user_input)
+	prompt = static + dynamic
+	logger.info("Constructed prompt with %d messages (%d cacheable)", len(prompt), len(static))
+	if logger.isEnabledFor(logging.DEBUG):
+		logger.debug("Prompt messages: %s", prompt)
+	dumper.dump_prompt(prompt, session_id=current_session.session_id)
+	return prompt, prompt_module.prompt_cache_breakpoints(static)
+
+
+def _try_combined_turn(
+	current_session: session_module.Session, user_input: str
+) -> tuple[Optional[InitialResponseJson], Optional[dict]]:
+	"""Get the reply and memory updates from one LLM call.
+
+	Returns (None, None) when the combined prompt or its output is unusable, so
+	the caller can fall back to the separate response and reflection calls.
+	Transport failures (connection errors, timeouts) are raised instead: a
+	second full request would only double the wait.
+	"""
+	try:
+		static, dynamic = prompt_module.construct_combined_prompt(current_session, user_input)
+	except Exception as exc:
+		logger.warning("Combined prompt failed; falling back to separate calls: %s", exc)
+		return None, None
+	prompt = static + dynamic
+	logger.info("Constructed combined prompt with %d messages (%d cacheable)", len(prompt), len(static))
 	dumper.dump_prompt(prompt, session_id=current_session.session_id)
-	return prompt
+	try:
+		return llm_router.generate_combined_response(
+			prompt, cache_breakpoints=prompt_module.prompt_cache_breakpoints(static)
+		)
+	except llm_router.OpenRouterTransportError:
+		raise
+	except llm_router.OpenRouterError as exc:
+		logger.warning("Combined response failed; falling back to separate calls: %s", exc)
+		return None, None
 
 	
+# CONVERSATION SUMMARY
+
+def _maybe_schedule_summary(session: session_module.Session) -> None:
+	"""Fold the oldest unsummarized messages that fell out of the prompt window
+	into the session summary, in the background."""
+	if SUMMARY_CHUNK_MESSAGES <= 0 or session.session_id in _SUMMARIES:
+		return
+	start = session.summary_frontier
+	end = start + SUMMARY_CHUNK_MESSAGES
+	if end > prompt_module.history_start(len(session.messages)):
+		return  # still inside the window the prompt shows verbatim
+
+	# Built here so the worker never reads the live session.
+	chunk = list(itertools.islice(session.messages, start, end))
+	prompt = prompt_module.construct_summary_prompt(session.summary, chunk)
+	session_id = session.session_id
+	future = executors.submit(_nonfatal_step, "Summary", lambda: _apply_summary(session, prompt, end))
+	_SUMMARIES[session_id] = future
+	# Registered after the entry is stored, so a job that already finished
+	# (e.g. run inline at shutdown) still clears it.
+	future.add_done_callback(lambda f: _forget_summary(session_id, f))
+
+
+def _forget_summary(session_id: str, future: Future) -> None:
+	if _SUMMARIES.get(session_id) is future:
+		del _SUMMARIES[session_id]
+
+
+def _apply_summary(session: session_module.Session, prompt: list[dict[str, str]], frontier: int) -> None:
+	summary = llm_router.generate_text(prompt)
+	with _session_lock(session.session_id):
+		session.summary = summary
+		session.summary_frontier = frontier
+	session_writer.mark_dirty(session)
+	logger.info("Summarized session %s up to message %d", session.session_id, frontier)
+
+
 # REFLECTION HANDLING
 
-def _handle_reflection(session: session_module.Session) -> None:
-	reflection_prompt = prompt_module.construct_reflection_prompt(session)
+def _handle_reflection_safe(session: session_module.Session) -> None:
+	"""Start reflection for `session`; failures are logged, never raised."""
+	_nonfatal_step("Reflection", lambda: _handle_reflection(session))
+
 
-	logger.debug("Constructed reflection prompt: %s", reflection_prompt)
-	dumper.dump_reflection_prompt(reflection_prompt, session_id=session.session_id)
+def _handle_reflection(session: session_module.Session) -> None:
+	# Copy the turn now so the worker never reads the live session.
+	recent = [dict(msg) for msg in session_module.recent_messages(session, REFLECTION_MESSAGE_LIMIT)]
+	session_id = session.session_id
+	# Reflection only feeds long-term memory, so it runs off the request path.
+	_queue_reflection(session_id, lambda: _apply_reflection(recent, session_id))
+
+
+def _queue_reflection(session_id: str, job: Callable[[], None]) -> None:
+	"""Run `job` in the background once every reflection queued earlier for
+	`session_id` has finished."""
+	done: Future = Future()
+	with _REFLECTIONS_LOCK:
+		previous = _REFLECTIONS.get(session_id)
+		_REFLECTIONS[session_id] = done
+
+	def run() -> None:
+		try:
+			_nonfatal_step("Reflection", job)
+		finally:
+			with _REFLECTIONS_LOCK:
+				if _REFLECTIONS.get(session_id) is done:
+					del _REFLECTIONS[session_id]
+			done.set_result(None)
+
+	if previous is None:
+		executors.submit(run)
+	else:
+		previous.add_done_callback(lambda _: executors.submit(run))
+
+
+def _apply_reflection(recent: list[dict[str, Any]], session_id: str) -> None:
+	# Built only now, so the memory block includes the previous reflection's updates.
+	reflection_prompt = prompt_module.construct_reflection_prompt_from_messages(recent)
+	if logger.isEnabledFor(logging.DEBUG):
+		logger.debug("Constructed reflection prompt: %s", reflection_prompt)
+	dumper.dump_reflection_prompt(reflection_prompt, session_id=session_id)
 
 	# Call LLM for reflection
-	reflection_output = llm_router.generate_reflection_response(reflection_prompt)
+	# The reflection instructions (first message) are the same every turn.
+	reflection_output = llm_router.generate_reflection_response_cached(reflection_prompt, cache_breakpoints=[0])
 	logger.info("Received reflection response from OpenRouter")
-	logger.debug("Reflection output: %s", reflection_output)
+	if logger.isEnabledFor(logging.DEBUG):
+		logger.debug("Reflection output: %s", reflection_output)
 	
-	payload = json.loads(reflection_output)
-	
-	# Gate memory updates and apply to long-term memory
-	gated_payload, gate_stats = memory_system.gate_memory_updates(
-		payload,
-		min_confidence=MIN_MEMORY_CONFIDENCE,
-	)
+	_apply_memory_payload(schemas.decode_reflection(reflection_output), session_id)
+
+
+def _apply_memory_payload(payload: Any, session_id: str) -> None:
+	# Gate candidates by confidence while applying them to long-term memory
+	with _session_lock(session_id):
+		_, gate_stats = memory_system.apply_memory_updates(
+			payload,
+			source_session_id=session_id,
+			min_confidence=MIN_MEMORY_CONFIDENCE,
+		)
 	if gate_stats.get("removed"):
 		logger.info(
 			"Gated reflection candidates: kept=%d removed=%d (min_confidence=%s)",
@@ -132,12 +342,28 @@ def _handle_reflection(session: session_module.Session) -> None:
 			gate_stats.get("removed", 0),
 			MIN_MEMORY_CONFIDENCE,
 		)
-	logger.debug("Gated reflection output: %s", json.dumps(gated_payload, indent=2))
-	memory_system.apply_memory_updates(gated_payload, source_session_id=session.session_id)
 	return
 
 ## SCREEN CAPTURE
 
+# EasyOCR reader, built on the first capture and reused (init loads the models).
+_OCR_ENGINE = None
+_OCR_ENGINE_LOCK = threading.Lock()
+
+
+def _get_ocr_engine():
+	global _OCR_ENGINE
+	with _OCR_ENGINE_LOCK:
+		if _OCR_ENGINE is None:
+			from .ocr.ocr_tool import EasyOcrEngine
+
+			try:
+				_OCR_ENGINE = EasyOcrEngine(languages=["en"], gpu=True)
+			except Exception:
+				logger.info("EasyOCR GPU init failed; retrying with gpu=False")
+				_OCR_ENGINE = EasyOcrEngine(languages=["en"], gpu=False)
+		return _OCR_ENGINE
+
 def _capture_and_store_screen_context(session: session_module.Session) -> None:
 	"""
 	Capture screen context using OCR tool.
@@ -146,24 +372,40 @@ def _capture_and_store_screen_context(session: session_module.Session) -> None:
 		RuntimeError: if screen capture or OCR fails.
 	"""
 
+	# OCR pulls in EasyOCR (and torch); only import it when context is requested.
+	from .ocr.ocr_tool import capture_and_ocr
+
 	logger.info("Capturing screen context")
-	try:
-		engine = EasyOcrEngine(languages=["en"], gpu=True)
-	except Exception:
-		logger.info("EasyOCR GPU init failed; retrying with gpu=False")
-		engine = EasyOcrEngine(languages=["en"], gpu=False)
-	ctx = capture_and_ocr(engine)
+	ctx = capture_and_ocr(_get_ocr_engine())
 	
 	if not ctx.text.strip():
 		raise RuntimeError("OCR capture succeeded but produced no text")
 
 	session_module.append_screen_context(session, text=ctx.text, source=ctx.source)
-	session_module.save_session(session)
+	session_writer.mark_dirty(session)
 	logger.info("Stored screen context for session %s", session.session_id)
 
 ## RUNNER FUNCTION
 
-def run_agent(opts: RunOptions) -> tuple[InitialResponseJson, str]:
+def _generate_output(
+	prompt: list[dict[str, str]],
+	cache_breakpoints: list[int],
+	on_token: Optional[Callable[[str], None]],
+) -> InitialResponseJson:
+	if on_token is not None:
+		# Streamed replies are always fresh so the caller sees every token.
+		return llm_router.generate_response(prompt, cache_breakpoints=cache_breakpoints, on_token=on_token)
+	return llm_router.generate_response_cached(prompt, cache_breakpoints=cache_breakpoints)
+
+
+def run_agent(
+	opts: RunOptions,
+	*,
+	on_token: Optional[Callable[[str], None]] = None,
+) -> tuple[InitialResponseJson, str]:
+	"""Run one turn. With `on_token`, the LLM reply is streamed and its
+	display_text is passed to it as it arrives, before the parsed output is
+	returned."""
 	try:
 		# Load/create session
 		current_session = _fatal_step(
@@ -180,26 +422,36 @@ def run_agent(opts: RunOptions) -> tuple[InitialResponseJson, str]:
 			)
 	
 	
-		# Construct prompt
-		prompt = _fatal_step(
-			"Prompt construction",
-			lambda: _build_prompt(current_session, opts.user_input),
-			fallback_prefix="Prompt error",
-		)
+		output, memory_updates = None, None
+		if COMBINED_REFLECTION and on_token is None:
+			output, memory_updates = _fatal_step(
+				"LLM response",
+				lambda: _try_combined_turn(current_session, opts.user_input),
+				fallback_prefix="LLM error",
+			)
 
-		# Call LLM for response
-		output = _fatal_step(
-			"LLM response",
-			lambda: llm_router.generate_response(prompt),
-			fallback_prefix="LLM error",
-		)
+		if output is None:
+			# Construct prompt
+			prompt, cache_breakpoints = _fatal_step(
+				"Prompt construction",
+				lambda: _build_prompt(current_session, opts.user_input),
+				fallback_prefix="Prompt error",
+			)
+
+			# Call LLM for response
+			output = _fatal_step(
+				"LLM response",
+				lambda: _generate_output(prompt, cache_breakpoints, on_token),
+				fallback_prefix="LLM error",
+			)
 
 	except FatalStepError as exc:
 		# Single place where you decide what user sees
 		return fallback_response(exc.user_message)
 
-	# Non-fatal Save turn and reflection
-	_nonfatal_step("Save turn", lambda: _append_messages_and_save(current_session, opts.user_input, output))
-	_nonfatal_step("Reflection", lambda: _handle_reflection(current_session))
+	# Non-fatal save turn and reflection, overlapped with returning the output
+	_PENDING_TURNS[current_session.session_id] = executors.submit(
+		_persist_turn, current_session, opts.user_input, output, memory_updates
+	)
 
 	return output, current_session.session_id
\ No newline at end of file
@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+# One buffered write per file instead of many small ones.
+_WRITE_BUFFER_SIZE = 64 * 1024
+
+
+def atomic_write_bytes(path: Path, data: bytes) -> Path:
+	"""Write `data` to `path` so readers only ever see the old or new file.
+
+	The bytes go to a sibling ".tmp" file first and are swapped in with
+	os.replace, which is atomic on the same filesystem. The file and the
+	rename are fsynced before returning, so callers may delete whatever the
+	new file supersedes (e.g. a session's JSONL log) without risking a torn
+	or empty file after a crash.
+	"""
+	tmp = path.with_suffix(path.suffix + ".tmp")
+	try:
+		with open(tmp, "wb", buffering=_WRITE_BUFFER_SIZE) as f:
+			f.write(data)
+			f.flush()
+			os.fsync(f.fileno())
+		os.replace(tmp, path)
+	except BaseException:
+		tmp.unlink(missing_ok=True)
+		raise
+	_fsync_dir(path.parent)
+	return path
+
+
+def _fsync_dir(directory: Path) -> None:
+	"""Persist a rename in `directory`; a no-op where directories can't be opened (Windows)."""
+	try:
+		fd = os.open(directory, os.O_RDONLY)
+	except OSError:
+		return
+	try:
+		os.fsync(fd)
+	except OSError:
+		pass
+	finally:
+		os.close(fd)
+
+
+def atomic_write_text(path: Path, text: str, *, encoding: str = "utf-8") -> Path:
+	return atomic_write_bytes(path, text.encode(encoding))
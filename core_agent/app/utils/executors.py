@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+import atexit
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable
+
+from ..config import IO_WORKERS
+
+# One pool per process for background I/O and off-request work (turn saves,
+# reflection, prompt dumps) instead of a handful of small per-module pools.
+IO_POOL = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="io")
+atexit.register(IO_POOL.shutdown, wait=True)
+
+
+def submit(fn: Callable[..., Any], *args: Any) -> Future:
+	"""Run `fn(*args)` on IO_POOL, or inline once the pool stops accepting work.
+
+	During interpreter shutdown a finishing task can still queue follow-up work
+	(e.g. a turn's reflection); running it inline keeps it from being dropped.
+	"""
+	try:
+		return IO_POOL.submit(fn, *args)
+	except RuntimeError:
+		future: Future = Future()
+		try:
+			future.set_result(fn(*args))
+		except BaseException as exc:
+			future.set_exception(exc)
+		return future
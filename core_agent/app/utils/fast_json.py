@@ -0,0 +1,35 @@
+"""JSON helpers that use orjson when it is installed and stdlib json otherwise."""
+from __future__ import annotations
+
+import json
+from typing import Any, Union
+
+try:
+	import orjson
+	ORJSON_AVAILABLE = True
+except ImportError:
+	ORJSON_AVAILABLE = False
+
+
+def loads(data: Union[str, bytes, bytearray]) -> Any:
+	"""Decode JSON text or bytes.
+
+	Raises json.JSONDecodeError on invalid input (orjson's error subclasses it).
+	"""
+	if ORJSON_AVAILABLE:
+		try:
+			return orjson.loads(data)
+		except orjson.JSONDecodeError:
+			# orjson rejects NaN/Infinity, which stdlib json.dumps writes and
+			# json.loads accepts; older files may contain them.
+			pass
+	return json.loads(data)
+
+
+def dumps_bytes(obj: Any, *, indent: bool = False) -> bytes:
+	"""Encode `obj` as UTF-8 JSON bytes, compact or with a 2-space indent."""
+	if ORJSON_AVAILABLE:
+		return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0)
+	if indent:
+		return json.dumps(obj, ensure_ascii=False, indent=2).encode("utf-8")
+	return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
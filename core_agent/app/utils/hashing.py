@@ -0,0 +1,17 @@
+"""Fast content digests for cache keys and version stamps (not for security)."""
+from __future__ import annotations
+
+import hashlib
+
+try:
+	from blake3 import blake3
+	BLAKE3_AVAILABLE = True
+except ImportError:
+	BLAKE3_AVAILABLE = False
+
+
+def digest(data: bytes, size: int = 16) -> bytes:
+	"""`size`-byte digest of `data`: BLAKE3 when installed, else BLAKE2b."""
+	if BLAKE3_AVAILABLE:
+		return blake3(data).digest(length=size)
+	return hashlib.blake2b(data, digest_size=size).digest()
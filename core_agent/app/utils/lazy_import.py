@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+import importlib
+import importlib.util
+import sys
+from types import ModuleType
+from typing import Any
+
+
+class _LazyModule(ModuleType):
+	"""Stand-in that imports the real module on first attribute access.
+
+	The import goes through importlib.import_module, which holds the module's
+	import lock, so threads touching it for the first time at once load it
+	exactly once (importlib.util.LazyLoader is not thread-safe before 3.12).
+	"""
+
+	def __getattr__(self, attr: str) -> Any:
+		return getattr(importlib.import_module(self.__name__), attr)
+
+
+def lazy_import(name: str) -> ModuleType:
+	"""Return module `name`, deferring its execution until first attribute access.
+
+	Lets a module bind heavy dependencies at import time while only paying for
+	them on the code paths that actually use them.
+	"""
+	module = sys.modules.get(name)
+	if module is not None:
+		return module
+	if importlib.util.find_spec(name) is None:
+		raise ImportError(f"No module named {name!r}", name=name)
+	return _LazyModule(name)
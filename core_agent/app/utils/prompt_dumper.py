@@ -1,11 +1,71 @@
 from __future__ import annotations
 
+import atexit
+import io
+import threading
 from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import BinaryIO, Optional
 
 from ..config import LOGS_DIR
+from . import executors
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+# path -> newest rendered dump not yet written. A burst of dumps to the same
+# file collapses into one write of the latest text.
+_PENDING_DUMPS: dict[Path, str] = {}
+_PENDING_LOCK = threading.Lock()
+# Serializes writes so an older dump can never land after a newer one.
+# Also guards _HANDLES.
+_WRITE_LOCK = threading.Lock()
+# Dump files stay open between turns; each dump rewrites the file in place.
+_HANDLES: dict[Path, BinaryIO] = {}
+
+
+def _dump_handle(path: Path) -> BinaryIO:
+	handle = _HANDLES.get(path)
+	# Reopen if someone deleted the file (e.g. cleared the logs dir).
+	if handle is None or not path.exists():
+		if handle is not None:
+			handle.close()
+		LOGS_DIR.mkdir(parents=True, exist_ok=True)
+		handle = open(path, "wb")
+		_HANDLES[path] = handle
+	return handle
+
+
+def _write_pending_dump(path: Path) -> None:
+	with _WRITE_LOCK:
+		with _PENDING_LOCK:
+			text = _PENDING_DUMPS.pop(path, None)
+		if text is None:
+			return
+		try:
+			handle = _dump_handle(path)
+			handle.seek(0)
+			handle.write(text.encode("utf-8"))
+			handle.truncate()
+			handle.flush()
+		except Exception:
+			# Intentionally swallow dump failures: prompt dumping must never break the main flow.
+			_HANDLES.pop(path, None)
+
+
+def close_all() -> None:
+	"""Close every open dump file."""
+	with _WRITE_LOCK:
+		for handle in _HANDLES.values():
+			try:
+				handle.close()
+			except OSError:
+				pass
+		_HANDLES.clear()
+
+
+atexit.register(close_all)
 
 
 @dataclass
@@ -33,29 +93,32 @@ class PromptDumper:
 		)
 
 	def _dump(self, path: Path, *, label: str, messages: list, session_id: Optional[str]) -> None:
+		# Render on the caller (the prompt may change after we return), write in the background.
 		try:
-			LOGS_DIR.mkdir(parents=True, exist_ok=True)
-			lines: list[str] = []
-			lines.append(f"# label: {label}")
-			lines.append(f"# ts: {datetime.utcnow().isoformat()}Z")
+			buf = io.StringIO()
+			w = buf.write
+			w(f"# label: {label}\n")
+			w(f"# ts: {datetime.utcnow().isoformat()}Z\n")
 			if session_id:
-				lines.append(f"# session_id: {session_id}")
-			lines.append(f"# messages: {len(messages)}")
-			lines.append("")
+				w(f"# session_id: {session_id}\n")
+			w(f"# messages: {len(messages)}\n")
 
 			for i, msg in enumerate(messages):
 				role = msg.get("role", "") if isinstance(msg, dict) else ""
 				content = msg.get("content", "") if isinstance(msg, dict) else str(msg)
-				lines.append(f"[{i}] role={role}")
-				lines.append("-----")
-				lines.append(content)
-				lines.append("=====")
+				w(f"\n[{i}] role={role}\n-----\n{content}\n=====")
 
-			path.write_text("\n".join(lines), encoding="utf-8")
+			text = buf.getvalue()
 		except Exception:
 			# Intentionally swallow dump failures: prompt dumping must never break the main flow.
 			return
 
+		with _PENDING_LOCK:
+			scheduled = path in _PENDING_DUMPS
+			_PENDING_DUMPS[path] = text
+		if not scheduled:
+			executors.submit(_write_pending_dump, path)
+
 
 _PROMPT_DUMPER = PromptDumper(enabled=False)
 